@@ -0,0 +1,150 @@
+# Two-level cache for analyzed WhatsApp uploads (memory LRU + SQLite)
+
+import hashlib
+import io
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+
+class AnalysisCache:
+    """Cache attendance results keyed by a BLAKE2 hash of the upload bytes.
+
+    The key also includes the classifier pattern version, so editing the
+    response patterns invalidates old results automatically. Recent results
+    live in an in-memory LRU; all results are also kept (zlib-compressed JSON)
+    in the ``analysis_cache`` table until the size budget evicts them.
+    """
+
+    def __init__(self, db_name: str = "futbol_sevenler.db", memory_entries: int = 32,
+                 disk_bytes: int = 50 * 1024 * 1024):
+        self.db_name = db_name
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._init_table()
+
+    def _init_table(self):
+        try:
+            conn = sqlite3.connect(self.db_name)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used ON analysis_cache (last_used)')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Cache init hatası: {e}")
+
+    @staticmethod
+    def make_key(data: bytes, pattern_version: str) -> str:
+        digest = hashlib.blake2b(data, digest_size=20)
+        digest.update(b'\0' + pattern_version.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_or_compute(self, data: bytes, pattern_version: str,
+                       compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Return the cached result for ``data`` or run ``compute`` and store it."""
+        key = self.make_key(data, pattern_version)
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return cached.copy()
+
+        cached = self._load(key)
+        if cached is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, cached)
+            return cached.copy()
+
+        with self._lock:
+            self.misses += 1
+        result = compute()
+        self._remember(key, result)
+        self._store(key, result)
+        return result.copy()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        try:
+            conn = sqlite3.connect(self.db_name)
+            conn.execute('DELETE FROM analysis_cache')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Cache clear hatası: {e}")
+
+    def _remember(self, key: str, df: pd.DataFrame):
+        with self._lock:
+            self._memory[key] = df
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[pd.DataFrame]:
+        try:
+            conn = sqlite3.connect(self.db_name)
+            row = conn.execute('SELECT payload FROM analysis_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                conn.close()
+                return None
+            conn.execute('UPDATE analysis_cache SET last_used = ? WHERE key = ?', (time.time(), key))
+            conn.commit()
+            conn.close()
+            return pd.read_json(io.StringIO(zlib.decompress(row[0]).decode('utf-8')),
+                                orient='table')
+        except Exception as e:
+            print(f"Cache load hatası: {e}")
+            return None
+
+    def _store(self, key: str, df: pd.DataFrame):
+        try:
+            payload = zlib.compress(df.to_json(orient='table', index=False).encode('utf-8'))
+            conn = sqlite3.connect(self.db_name)
+            conn.execute('''
+                INSERT OR REPLACE INTO analysis_cache (key, payload, size, last_used)
+                VALUES (?, ?, ?, ?)
+            ''', (key, payload, len(payload), time.time()))
+
+            # Boyut sınırı aşıldıysa en uzun süredir kullanılmayanları sil
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM analysis_cache').fetchone()[0]
+            if total > self.disk_bytes:
+                for old_key, size in conn.execute(
+                        'SELECT key, size FROM analysis_cache ORDER BY last_used ASC').fetchall():
+                    if total <= self.disk_bytes or old_key == key:
+                        break
+                    conn.execute('DELETE FROM analysis_cache WHERE key = ?', (old_key,))
+                    total -= size
+
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"Cache store hatası: {e}")
@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils import RegistrationManager, DatabaseManager
+from utils import (RegistrationManager, TeamBalancer, DataExporter,
+                   WhatsAppParser, AttendanceTracker, validate_whatsapp_format)
+from config import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, DEFAULT_GROUP
+from tenancy import GroupRegistry
+from normalization import TrigramIndex, display_name
+from backup import BackupManager
+import html
+import io
 import json
 import os
 from pathlib import Path
@@ -60,12 +67,28 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def get_player_status(position, total_count):
+# config.EXPORT_FORMATS içindeki her format için: (uzantı, MIME tipi)
+EXPORT_FILE_TYPES = {
+    "CSV": ("csv", "text/csv"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "JSON Lines": ("jsonl", "application/jsonl"),
+    "Text Summary": ("txt", "text/plain"),
+}
+
+@st.cache_resource
+def get_group_registry():
+    """Grup shard'ları tüm oturumlar arasında paylaşılır"""
+    return GroupRegistry()
+
+# Gün adları (datetime.weekday() sırası)
+WEEKDAY_NAMES = ["Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar"]
+
+def get_player_status(position, total_count, main_capacity=10, total_capacity=18):
     """Determine if player is playing, waiting, or reserve based on even/odd logic"""
-    if position <= 10:
+    if position <= main_capacity:
         return 'playing'
-    elif position <= 18:
-        # For positions 11-18, check if total count makes an even number
+    elif position <= total_capacity:
+        # For positions after the main list, check if total count makes an even number
         # If current total is odd, the last person waits
         if total_count % 2 == 1 and position == total_count:
             return 'waiting'
@@ -75,19 +98,39 @@ def get_player_status(position, total_count):
         return 'reserve'
 
 def main():
-    st.markdown('<h1 class="main-header">⚽ Futbol Sevenler</h1>', unsafe_allow_html=True)
+    # Grup seçimi URL'den: ?group=<id> - her grubun kendi veritabanı ve ayarları var
+    try:
+        shard = get_group_registry().get(st.query_params.get("group", DEFAULT_GROUP))
+    except KeyError as e:
+        st.error(f"❌ Bilinmeyen grup: {e.args[0]}")
+        st.stop()
+    settings = shard.settings
+    main_capacity = settings['main_capacity']
+    total_capacity = settings['total_capacity']
+    deadline_day = WEEKDAY_NAMES[settings['deadline_weekday']]
+    deadline_text = f"{deadline_day} {settings['deadline_hour']:02d}:00"
+    match_text = f"{settings['match_hour']:02d}:00"
     
-    # Database başlat
-    if 'db' not in st.session_state:
-        st.session_state.db = DatabaseManager()
+    st.markdown(f'<h1 class="main-header">⚽ {settings["name"]}</h1>', unsafe_allow_html=True)
     
-    if 'registration_manager' not in st.session_state:
-        st.session_state.registration_manager = RegistrationManager()
+    # Grup değiştiyse oturumdaki eski grubun verisini bırak
+    if st.session_state.get('group_id') != shard.group_id:
+        for key in ['registered_players', 'name_index', 'last_cleanup_date', 'export_file']:
+            st.session_state.pop(key, None)
+        st.session_state.group_id = shard.group_id
+        st.session_state.registration_manager = RegistrationManager(main_capacity, total_capacity)
+    
+    # Database başlat
+    st.session_state.db = shard.db
     
     # İlk açılışta veritabanından yükle
     if 'registered_players' not in st.session_state:
         st.session_state.registered_players = st.session_state.db.get_all_players()
     
+    # Benzer isim kontrolü için arşiv dahil tüm isimlerin trigram indeksi
+    if 'name_index' not in st.session_state:
+        st.session_state.name_index = TrigramIndex(st.session_state.db.get_known_names())
+    
     # Hafta başında otomatik backup ve temizleme (Pazartesi sabahı) - Sadece bir kez
     if 'last_cleanup_date' not in st.session_state:
         st.session_state.last_cleanup_date = None
@@ -95,6 +138,9 @@ def main():
     today = datetime.now().date()
     # Pazartesi ve daha önce temizlenmediyse
     if datetime.now().weekday() == 0 and st.session_state.last_cleanup_date != today:
+        # Arşivlemeden önce canlı yedek al - günde bir kez, bugünün yedeği varsa diğer oturumlar atlar
+        BackupManager(st.session_state.db.db_name, backup_dir=shard.backup_dir).create_daily_snapshot()
+        
         # ARCHIVE VE TEMİZLE - Veritabanında güvenli şekilde
         if st.session_state.db.archive_week():
             st.info("📦 Geçmiş hafta verisi arşivlendi ve korunuyor...")
@@ -104,24 +150,25 @@ def main():
         st.session_state.last_cleanup_date = today
         st.success("✅ Yeni hafta başladı! Eski veriler arşivde kalıcı olarak korunuyor.")
     
-    deadline = datetime.now().replace(hour=13, minute=0, second=0, microsecond=0)
-    is_deadline_passed = datetime.now().weekday() == 6 and datetime.now() > deadline
+    deadline = datetime.now().replace(hour=settings['deadline_hour'], minute=0, second=0, microsecond=0)
+    is_deadline_day = datetime.now().weekday() == settings['deadline_weekday']
+    is_deadline_passed = is_deadline_day and datetime.now() > deadline
     
     # Test aşaması uyarısı - Kırmızı not
-    st.error("⚠️ **TEST AŞAMASI** - Cuma gününden itibaren gerçek oylama buradan olacaktır! Oylama pazar saat 13:00 dan sonra kitlenicek ve kullanicilar ekleme yapamayacak. Toplam sayi tek sayi ise, oyuncu beklemede gozukecek ve sayi cift olunca listeye obur oyuncu ile beraber dahil olucak. Lutfen kullanici isminizi girin ve cumaya kadar test yapalim, boylelikle herkes sistemin nasil calistigini gormus olur. Ektra oneri ve fikir icin waatsaptan bildiriniz.")
+    st.error(f"⚠️ **TEST AŞAMASI** - Cuma gününden itibaren gerçek oylama buradan olacaktır! Oylama {deadline_text} dan sonra kitlenicek ve kullanicilar ekleme yapamayacak. Toplam sayi tek sayi ise, oyuncu beklemede gozukecek ve sayi cift olunca listeye obur oyuncu ile beraber dahil olucak. Lutfen kullanici isminizi girin ve cumaya kadar test yapalim, boylelikle herkes sistemin nasil calistigini gormus olur. Ektra oneri ve fikir icin waatsaptan bildiriniz.")
     
     if is_deadline_passed:
-        st.error("🚫 KAYIT SÜRESİ DOLDU! Kayıtlar Pazar saat 13:00'a kadar alınır. Maç saat 20:00'de başlayacak.")
-    elif datetime.now().weekday() == 6:
+        st.error(f"🚫 KAYIT SÜRESİ DOLDU! Kayıtlar {deadline_day} saat {settings['deadline_hour']:02d}:00'a kadar alınır. Maç saat {match_text}'de başlayacak.")
+    elif is_deadline_day:
         time_left = deadline - datetime.now()
-        st.warning(f"⏰ Kayıt için {time_left.seconds//3600} saat {(time_left.seconds//60)%60} dakika kaldı! Maç saat 20:00'de.")
+        st.warning(f"⏰ Kayıt için {time_left.seconds//3600} saat {(time_left.seconds//60)%60} dakika kaldı! Maç saat {match_text}'de.")
     
     # Kurallar - Mobilde küçük expander
     with st.expander("ℹ️ Bilgi ve Kurallar"):
-        st.markdown("""
-        **🕒 Kayıt:** Pazar 13:00'a kadar | **⚽ Maç:** 20:00  
+        st.markdown(f"""
+        **🕒 Kayıt:** {deadline_text}'a kadar | **⚽ Maç:** {match_text}  
         **👥 Sistem:** Çift sayı = Hepsi oynar | Tek sayı = 1 kişi bekler  
-        **📊 Kapasite:** Maks 18 sahada | 18+ yedek
+        **📊 Kapasite:** Maks {total_capacity} sahada | {total_capacity}+ yedek
         """)
     
     # Kayıt formu - Tek satırda
@@ -136,9 +183,10 @@ def main():
         with col2:
             if st.button("📝 Kayıt", type="primary", use_container_width=True):
                 if player_name.strip():
-                    name = player_name.strip().title()
+                    name = display_name(player_name)
                     # Veritabanına ekle
                     if st.session_state.db.add_player(name, len(st.session_state.registered_players) + 1):
+                        st.session_state.name_index.add(name)
                         st.session_state.registered_players = st.session_state.db.get_all_players()
                         st.success(f"✅ {name} kaydedildi!")
                         st.rerun()
@@ -146,7 +194,44 @@ def main():
                         st.error(f"❌ {name} zaten kayıtlı!")
                 else:
                     st.error("❌ Lütfen adınızı yazın!")
+        
+        # Yakın yazımları uyar ("Mehmet Demir" / "Mehmed Demir") - aynı yazım zaten aynı kişi sayılır
+        if player_name.strip():
+            similar = [n for n, score in st.session_state.name_index.similar(player_name) if score < 1.0]
+            if similar:
+                st.warning(f"🔎 Benzer isimler var: {', '.join(similar)} - aynı kişiyseniz lütfen o yazımı kullanın.")
     
+    # WhatsApp mesajlarından toplu kayıt - "geliyorum" diyenler tek seferde eklenir
+    if not is_deadline_passed:
+        with st.expander("📋 WhatsApp'tan Toplu Ekle"):
+            uploaded_chat = st.file_uploader("Sohbet dışa aktarımı (.txt)", type=["txt"], key="bulk_import_file")
+            chat_text = st.text_area(
+                "WhatsApp mesajları",
+                placeholder="[10/13/25, 3:45:23 PM] Ali: Geliyorum",
+                label_visibility="collapsed",
+                key="bulk_import_text"
+            )
+            if st.button("📋 İçe Aktar", use_container_width=True):
+                chat_bytes = uploaded_chat.getvalue() if uploaded_chat else chat_text.encode('utf-8')
+                is_valid, validation_message = validate_whatsapp_format(chat_bytes.decode('utf-8', errors='replace'))
+                if not is_valid:
+                    st.error(f"❌ {validation_message}")
+                else:
+                    # Aynı dosya tekrar yüklenirse analiz önbellekten gelir
+                    attendance = AttendanceTracker().analyze_upload(chat_bytes, shard.cache)
+                    outcomes = st.session_state.db.import_players(attendance)
+                    added = [name for name, outcome in outcomes.items() if outcome == 'added']
+                    skipped = [name for name, outcome in outcomes.items() if outcome != 'added']
+                    for name in added:
+                        st.session_state.name_index.add(name)
+                    st.session_state.registered_players = st.session_state.db.get_all_players()
+                    if added:
+                        st.success(f"✅ {len(added)} oyuncu eklendi: {', '.join(added)}")
+                    if skipped:
+                        st.info(f"ℹ️ Eklenmeyen ({len(skipped)}): {', '.join(skipped)}")
+                    if not outcomes:
+                        st.warning("Katılacağını söyleyen kimse bulunamadı.")
+
     # Silme bölümü - Kompakt
     if st.session_state.registered_players and not is_deadline_passed:
         with st.expander("🗑️ Kayıt Sil"):
@@ -179,7 +264,7 @@ def main():
     reserve_count = 0
     
     for player in st.session_state.registered_players:
-        status = get_player_status(player['position'], total_registered)
+        status = get_player_status(player['position'], total_registered, main_capacity, total_capacity)
         if status == 'playing':
             playing_count += 1
         elif status == 'waiting':
@@ -199,7 +284,7 @@ def main():
     st.markdown("---")
     
     # Tabs for player list and team selection
-    tab1, tab2 = st.tabs(["👥 Oyuncu Listesi", "🟦 Takım Seçme"])
+    tab1, tab2, tab3 = st.tabs(["👥 Oyuncu Listesi", "🟦 Takım Seçme", "🔎 Mesaj Ara"])
     
     # TAB 1: Oyuncu Listesi
     with tab1:
@@ -208,7 +293,7 @@ def main():
             
             # Single list view with status indicators
             for player in st.session_state.registered_players:
-                status = get_player_status(player['position'], total_registered)
+                status = get_player_status(player['position'], total_registered, main_capacity, total_capacity)
                 team = player.get('team', '⚪')  # Get team, default to white circle
                 
                 if status == 'playing':
@@ -279,7 +364,25 @@ def main():
                     st.rerun()
                 else:
                     st.error("Lütfen bir oyuncu seçin!")
-        
+
+        # Otomatik dengeleme - sadece oynayan oyuncular, seçilen takımlar korunur
+        if st.button("⚖️ Takımları Otomatik Dengele", use_container_width=True):
+            playing_players = [
+                p for p in st.session_state.registered_players
+                if get_player_status(p['position'], total_registered, main_capacity, total_capacity) == 'playing'
+            ]
+            if len(playing_players) < 2:
+                st.error("Dengelemek için en az 2 oynayan oyuncu gerekli!")
+            else:
+                ratings = st.session_state.db.get_player_ratings([p['name'] for p in playing_players], total_capacity)
+                assignments = TeamBalancer().balance(playing_players, ratings)
+                if st.session_state.db.update_teams(assignments):
+                    st.session_state.registered_players = st.session_state.db.get_all_players()
+                    st.success(f"✅ {len(assignments)} oyuncu iki takıma dengeli şekilde dağıtıldı!")
+                    st.rerun()
+                else:
+                    st.error("Takım güncelleme hatası!")
+
         # Takım özeti
         st.markdown("---")
         st.subheader("📊 Takım Özeti")
@@ -308,5 +411,81 @@ def main():
                 for p in no_team:
                     st.write(f"  • {p['name']}")
 
+    # TAB 3: Mesaj Arama - yüklenen sohbetler FTS5 ile aranır
+    with tab3:
+        search = shard.search
+        if not search.available:
+            st.warning("Bu sunucudaki SQLite sürümü FTS5 desteklemiyor, mesaj arama kapalı.")
+        else:
+            st.caption(f"📚 Kayıtlı mesaj: {search.count()}")
+
+            with st.expander("➕ Sohbet Ekle"):
+                chat_file = st.file_uploader("Sohbet dışa aktarımı (.txt)", type=["txt"], key="search_ingest_file")
+                if st.button("💾 Mesajları Kaydet", use_container_width=True) and chat_file:
+                    store = WhatsAppParser().parse_store(chat_file.getvalue().decode('utf-8', errors='replace'))
+                    added = search.ingest(store, source=chat_file.name)
+                    st.success(f"✅ {len(store)} mesajdan {added} yeni mesaj kaydedildi.")
+
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                search_text = st.text_input("Ara", placeholder="ör. topu getiririm", label_visibility="collapsed",
+                                            key="search_text")
+            with col2:
+                search_days = st.selectbox("Dönem", [None, 7, 30, 365],
+                                           format_func=lambda d: "Tümü" if d is None else f"Son {d} gün",
+                                           label_visibility="collapsed", key="search_days")
+
+            if search_text.strip():
+                results = search.search(search_text, days=search_days)
+                if results:
+                    for row in results:
+                        # Mesajlar yüklenen sohbetten gelir - HTML olarak yorumlanmasın
+                        st.markdown(f"**{html.escape(row['sender'])}** · <small>{row['sent_at']}</small>"
+                                    f"<br>{html.escape(row['message'])}",
+                                    unsafe_allow_html=True)
+                else:
+                    st.info("Sonuç bulunamadı.")
+
+    # Dışa aktarma - satırlar veritabanından parça parça akıtılır
+    with st.expander("📥 Dışa Aktar"):
+        col1, col2 = st.columns(2)
+        with col1:
+            export_table = st.selectbox(
+                "Veri",
+                ["players", "archive"],
+                format_func=lambda t: "Bu Hafta" if t == "players" else "Arşiv",
+                key="export_table"
+            )
+        with col2:
+            export_format = st.selectbox(
+                "Format",
+                EXPORT_FORMATS,
+                key="export_format"
+            )
+
+        # Her yeniden çizimde değil, sadece istenince hazırla
+        if st.button("📦 Dosyayı Hazırla", use_container_width=True):
+            ext, mime = EXPORT_FILE_TYPES[export_format]
+            buffer = io.BytesIO()
+            row_count = DataExporter.export_table(
+                st.session_state.db, export_table, ext, buffer, chunk_size=EXPORT_CHUNK_SIZE
+            )
+            st.session_state.export_file = {
+                'data': buffer.getvalue(),
+                'file_name': f"futbol_sevenler_{export_table}_{datetime.now():%Y%m%d}.{ext}",
+                'mime': mime,
+                'rows': row_count
+            }
+
+        if 'export_file' in st.session_state:
+            export_file = st.session_state.export_file
+            st.download_button(
+                f"📥 {export_file['file_name']} ({export_file['rows']} satır)",
+                data=export_file['data'],
+                file_name=export_file['file_name'],
+                mime=export_file['mime'],
+                use_container_width=True
+            )
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,313 @@
+# Online backups for the Futbol Sevenler SQLite database
+#
+#   python backup.py create            # take a compressed snapshot now
+#   python backup.py list
+#   python backup.py prune
+#   python backup.py restore backups/futbol_sevenler-20251013-090000.db.gz
+#   python backup.py bench             # backup time / writer stalls under sign-up load
+
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class _SourceChanged(Exception):
+    """Another connection wrote to the source, so the paged copy restarted."""
+
+
+class BackupManager:
+    """SQLite backup API ile canlı yedekleme - kayıt yazanları uzun süre bekletmez"""
+
+    SNAPSHOT_SUFFIX = '.db.gz'
+    # Yedek klasörü başına kilit: aynı grubun oturumları aynı anda yedek almasın,
+    # bir grubun yedeği diğer grupları bekletmesin
+    _daily_locks: Dict[str, threading.Lock] = {}
+    _daily_locks_guard = threading.Lock()
+
+    def __init__(self, db_name: str = "futbol_sevenler.db", backup_dir: str = "backups",
+                 keep_last: int = 10, max_age_days: int = 90,
+                 pages_per_step: int = 64, step_sleep: float = 0.002, max_restarts: int = 3):
+        self.db_name = db_name
+        self.backup_dir = Path(backup_dir)
+        self.keep_last = keep_last              # En az bu kadar yedek her zaman kalır
+        self.max_age_days = max_age_days        # Bundan eski yedekler silinir
+        self.pages_per_step = pages_per_step    # Her adımda kopyalanan sayfa
+        self.step_sleep = step_sleep            # Adımlar arası bekleme (progress içinde uyunur)
+        self.max_restarts = max_restarts        # Bu kadar yeniden başlamadan sonra tek adımda kopyala
+
+    def create_snapshot(self) -> Optional[Dict]:
+        """Veritabanının tutarlı bir kopyasını al, sıkıştır ve eski yedekleri temizle
+
+        Önce ``pages_per_step`` sayfalık adımlarla kopyalanır ('paged'). Başka
+        bir bağlantı yazınca SQLite kopyayı baştan başlatır; ``max_restarts``
+        kez olursa tek adımlık kopyaya geçilir ('single-step'). Yoğun kayıt
+        sırasında yazanları bekletmeyen şey WAL modudur: tek adımlık kopya
+        sadece okuma anlık görüntüsü alır. Hangi yolun çalıştığı sonuçtaki
+        ``mode`` alanındadır.
+        """
+        try:
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            stem = f"{Path(self.db_name).stem}-{datetime.now():%Y%m%d-%H%M%S-%f}"
+            raw_path = self.backup_dir / f"{stem}.db.tmp"
+            final_path = self.backup_dir / f"{stem}{self.SNAPSHOT_SUFFIX}"
+
+            steps = 0
+            restarts = 0
+            mode = 'paged'
+            total_pages = 0
+            last_remaining = None
+
+            def progress(status, remaining, total):
+                nonlocal steps, restarts, total_pages, last_remaining
+                steps += 1
+                total_pages = total
+                # Başka bağlantı yazınca SQLite kopyayı baştan başlatır
+                if last_remaining is not None and remaining > last_remaining:
+                    restarts += 1
+                    if restarts >= self.max_restarts:
+                        raise _SourceChanged()
+                last_remaining = remaining
+                # Connection.backup'ın sleep parametresi sadece BUSY/LOCKED sonrası
+                # bekler; adımlar arasında beklemek için burada uyunur
+                if remaining and self.step_sleep:
+                    time.sleep(self.step_sleep)
+
+            started = time.perf_counter()
+            src = sqlite3.connect(self.db_name)
+            dest = sqlite3.connect(raw_path)
+            try:
+                try:
+                    # Her adım okuma kilidini kısa süre tutar; arada yazanlar devam eder
+                    src.backup(dest, pages=self.pages_per_step, progress=progress)
+                except _SourceChanged:
+                    # Sürekli yazma varken parça parça kopya hiç bitmeyebilir. WAL modunda
+                    # tek adımlık kopya tek bir okuma anlık görüntüsüdür, yazanları bekletmez.
+                    src.backup(dest, pages=-1)
+                    steps += 1
+                    mode = 'single-step'
+            finally:
+                dest.close()
+                src.close()
+            copy_seconds = time.perf_counter() - started
+
+            with open(raw_path, 'rb') as raw, gzip.open(final_path, 'wb', compresslevel=6) as gz:
+                shutil.copyfileobj(raw, gz)
+            raw_path.unlink()
+
+            self.prune()
+            return {
+                'path': str(final_path),
+                'mode': mode,
+                'pages': total_pages,
+                'steps': steps,
+                'restarts': restarts,
+                'copy_seconds': copy_seconds,
+                'total_seconds': time.perf_counter() - started,
+                'size_bytes': final_path.stat().st_size,
+            }
+        except Exception as e:
+            print(f"Backup hatası: {e}")
+            return None
+
+    def create_daily_snapshot(self) -> Optional[Dict]:
+        """Bugün için yedek yoksa al - aynı gün tekrar çağrılırsa hiçbir şey yapmaz
+
+        Uygulama her ziyaretçi oturumunda çağırabilir; kontrol oturumda değil
+        yedek klasöründe yapıldığı için günde sadece bir yedek alınır.
+        """
+        with self._daily_lock():
+            if self.snapshots_on(datetime.now().date()):
+                return None
+            return self.create_snapshot()
+
+    def _daily_lock(self) -> threading.Lock:
+        key = str(self.backup_dir.resolve())
+        with self._daily_locks_guard:
+            return self._daily_locks.setdefault(key, threading.Lock())
+
+    def snapshots_on(self, day: date) -> List[Path]:
+        """Belirli bir günde alınmış yedekler (dosya adındaki tarihe göre)"""
+        prefix = f"{Path(self.db_name).stem}-{day:%Y%m%d}-"
+        return [p for p in self.list_snapshots() if p.name.startswith(prefix)]
+
+    def list_snapshots(self) -> List[Path]:
+        """Yedekleri eskiden yeniye sıralı getir"""
+        if not self.backup_dir.exists():
+            return []
+        return sorted(self.backup_dir.glob(f"*{self.SNAPSHOT_SUFFIX}"),
+                      key=lambda p: p.stat().st_mtime)
+
+    def prune(self) -> List[Path]:
+        """Saklama süresini aşan yedekleri sil (son ``keep_last`` yedek korunur)"""
+        snapshots = self.list_snapshots()
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).timestamp()
+        removable = snapshots[:-self.keep_last] if self.keep_last else snapshots
+        removed = []
+        for path in removable:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed.append(path)
+        return removed
+
+    def restore(self, snapshot: str) -> bool:
+        """Yedeği canlı veritabanına geri yükle
+
+        Önce mevcut hali yedeklenir. Geri yükleme de backup API ile yapılır,
+        böylece açık bağlantılar bozuk bir dosya görmez.
+        """
+        tmp_path = None
+        try:
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix='.db', dir=self.backup_dir)
+            with os.fdopen(fd, 'wb') as raw, gzip.open(snapshot, 'rb') as gz:
+                shutil.copyfileobj(gz, raw)
+
+            src = sqlite3.connect(tmp_path)
+            try:
+                if src.execute('PRAGMA integrity_check').fetchone()[0] != 'ok':
+                    print(f"Restore hatası: {snapshot} bozuk")
+                    return False
+
+                if self.create_snapshot() is None:
+                    print("Restore hatası: mevcut veritabanı yedeklenemedi")
+                    return False
+
+                dest = sqlite3.connect(self.db_name, timeout=30)
+                try:
+                    src.backup(dest)
+                finally:
+                    dest.close()
+            finally:
+                src.close()
+            return True
+        except Exception as e:
+            print(f"Restore hatası: {e}")
+            return False
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def run_benchmark(archive_rows: int = 200_000, writers: int = 4, seconds: float = 3.0) -> Dict:
+    """Simüle edilmiş kayıt yükü altında yedek süresini ve yazma gecikmelerini ölç"""
+    from utils import DatabaseManager
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        db = DatabaseManager(db_path)
+
+        conn = sqlite3.connect(db_path)
+        conn.executemany('''
+            INSERT INTO archive (name, position, timestamp, team, week, year, name_key)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ((f'Oyuncu {i}', i % 25 + 1, '2024-01-01 12:00:00', '⚪', i % 52 + 1, 2000 + i // 5000,
+               f'oyuncu {i}') for i in range(archive_rows)))
+        conn.commit()
+        conn.close()
+
+        latencies = {'idle': [], 'backup': []}
+        phase = ['idle']
+        stop = threading.Event()
+
+        def writer(worker: int):
+            i = 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                db.add_player(f'Bench {worker}-{i}', i + 1)
+                latencies[phase[0]].append(time.perf_counter() - started)
+                i += 1
+
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+        for t in threads:
+            t.start()
+
+        time.sleep(seconds / 2)
+        phase[0] = 'backup'
+        manager = BackupManager(db_path, backup_dir=os.path.join(workdir, 'backups'))
+        result = manager.create_snapshot()
+        phase[0] = 'idle'
+        time.sleep(seconds / 2)
+
+        stop.set()
+        for t in threads:
+            t.join()
+
+        def summary(values):
+            if not values:
+                return {'writes': 0}
+            ordered = sorted(values)
+            return {
+                'writes': len(values),
+                'p50_ms': statistics.median(ordered) * 1000,
+                'p99_ms': ordered[int(len(ordered) * 0.99) - 1] * 1000,
+                'max_ms': ordered[-1] * 1000,
+            }
+
+        return {
+            'backup': result,
+            'writes_idle': summary(latencies['idle']),
+            'writes_during_backup': summary(latencies['backup']),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Futbol Sevenler veritabanı yedekleme")
+    parser.add_argument('--db', default="futbol_sevenler.db")
+    parser.add_argument('--dir', default="backups")
+    parser.add_argument('--keep-last', type=int, default=10)
+    parser.add_argument('--max-age-days', type=int, default=90)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('create')
+    sub.add_parser('list')
+    sub.add_parser('prune')
+    restore_parser = sub.add_parser('restore')
+    restore_parser.add_argument('snapshot')
+    bench_parser = sub.add_parser('bench')
+    bench_parser.add_argument('--rows', type=int, default=200_000)
+    bench_parser.add_argument('--writers', type=int, default=4)
+    args = parser.parse_args()
+
+    manager = BackupManager(args.db, args.dir, keep_last=args.keep_last,
+                            max_age_days=args.max_age_days)
+
+    if args.command == 'create':
+        result = manager.create_snapshot()
+        if result is None:
+            raise SystemExit(1)
+        print(f"✅ {result['path']} ({result['size_bytes'] / 1024:.1f} KB, "
+              f"{result['pages']} sayfa / {result['steps']} adım ({result['mode']}), "
+              f"{result['copy_seconds'] * 1000:.0f} ms)")
+    elif args.command == 'list':
+        for path in manager.list_snapshots():
+            print(f"{path}  {path.stat().st_size / 1024:.1f} KB")
+    elif args.command == 'prune':
+        for path in manager.prune():
+            print(f"🗑️ {path}")
+    elif args.command == 'restore':
+        if not manager.restore(args.snapshot):
+            raise SystemExit(1)
+        print(f"✅ {args.snapshot} geri yüklendi")
+    elif args.command == 'bench':
+        result = run_benchmark(args.rows, args.writers)
+        backup = result['backup'] or {}
+        print(f"Yedek ({backup.get('mode', '-')}): {backup.get('copy_seconds', 0) * 1000:.0f} ms kopya, "
+              f"{backup.get('total_seconds', 0) * 1000:.0f} ms toplam, {backup.get('steps', 0)} adım, "
+              f"{backup.get('restarts', 0)} yeniden başlama")
+        for label in ('writes_idle', 'writes_during_backup'):
+            stats = result[label]
+            if stats['writes']:
+                print(f"{label}: {stats['writes']} yazma, p50 {stats['p50_ms']:.2f} ms, "
+                      f"p99 {stats['p99_ms']:.2f} ms, max {stats['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# Headless batch processing of WhatsApp chat exports
+#
+#   python -m batch exports/ --out results/
+#   python -m batch "exports/**/*.txt" --workers 8
+#
+# Each export gets a summary text and a CSV part; all parts are merged into
+# results/attendance.csv. Finished files are recorded in results/manifest.jsonl,
+# so an interrupted run picks up where it stopped.
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+MANIFEST = 'manifest.jsonl'
+COMBINED = 'attendance.csv'
+
+
+def find_exports(inputs: List[str], pattern: str = '*.txt', exclude: Optional[Path] = None) -> List[Path]:
+    """Expand directories and glob patterns into a sorted, de-duplicated file list.
+
+    Files under ``exclude`` (the output folder) are skipped, so the tool's own
+    summaries are never picked up as chat exports on a re-run.
+    """
+    files = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.update(p for p in path.rglob(pattern) if p.is_file())
+        else:
+            files.update(Path(p) for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    resolved = (p.resolve() for p in files)
+    if exclude is not None:
+        exclude = exclude.resolve()
+        resolved = (p for p in resolved if exclude not in p.parents)
+    return sorted(resolved)
+
+
+def input_root(item: str) -> Path:
+    """Folder an input argument points into: the directory itself, or a glob's fixed prefix."""
+    path = Path(item)
+    if path.is_dir():
+        return path.resolve()
+    parts = []
+    for part in path.parts:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    root = Path(*parts) if parts else Path('.')
+    return (root if root.is_dir() else root.parent).resolve()
+
+
+def source_label(path: Path, roots: List[Path]) -> str:
+    """Path relative to the input it came from, e.g. 'grup-a/_chat.txt'.
+
+    Exports from different groups usually share a file name, so the name
+    alone cannot tell rows in the combined CSV apart.
+    """
+    for root in sorted(roots, key=lambda r: len(r.parts), reverse=True):
+        try:
+            relative = path.relative_to(root)
+        except ValueError:
+            continue
+        # Tek dosya verildiyse klasör adını da ekle, yoksa yine sadece dosya adı kalır
+        if len(relative.parts) == 1 and root.name:
+            relative = Path(root.name) / relative
+        return relative.as_posix()
+    return output_stem(path)
+
+
+def output_stem(path: Path) -> str:
+    """File name stem that stays unique when different folders hold the same name."""
+    digest = hashlib.blake2b(str(path).encode('utf-8'), digest_size=4).hexdigest()
+    return f"{path.stem}-{digest}"
+
+
+def file_signature(path: Path) -> Dict:
+    stat = path.stat()
+    return {'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def process_file(path: str, out_dir: str, label: str = None) -> Dict:
+    """Parse and classify one export; write its summary and CSV part (runs in a worker)."""
+    from utils import WhatsAppParser, AttendanceTracker, DataExporter
+
+    started = time.perf_counter()
+    source = Path(path)
+    text = source.read_bytes().decode('utf-8', errors='replace')
+
+    store = WhatsAppParser().parse_store(text)
+    attendance = AttendanceTracker().extract_attendance(store)
+
+    stem = output_stem(source)
+    summary_path = Path(out_dir) / 'summaries' / f"{stem}.txt"
+    part_path = Path(out_dir) / 'parts' / f"{stem}.csv"
+    if attendance.empty:
+        summary_path.write_text(f"{source.name}: no attendance responses found\n", encoding='utf-8')
+    else:
+        summary_path.write_text(DataExporter.to_summary_text(attendance), encoding='utf-8')
+
+    attendance.insert(0, 'source_file', label or source.name)
+    columns = list(attendance.columns) or ['source_file']
+    DataExporter.export_rows([list(attendance.itertuples(index=False, name=None))],
+                             columns, 'csv', part_path)
+
+    return {
+        **file_signature(source),
+        'messages': len(store),
+        'responses': len(attendance),
+        'seconds': time.perf_counter() - started,
+        'part': str(part_path),
+    }
+
+
+def load_manifest(out_dir: Path) -> Dict[str, Dict]:
+    """Finished files from earlier runs, keyed by path."""
+    done = {}
+    manifest = out_dir / MANIFEST
+    if manifest.exists():
+        with open(manifest, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # half-written line from an interrupted run
+                done[entry['path']] = entry
+    return done
+
+
+def is_done(path: Path, done: Dict[str, Dict]) -> bool:
+    entry = done.get(str(path))
+    if entry is None or not Path(entry['part']).exists():
+        return False
+    signature = file_signature(path)
+    return entry['size'] == signature['size'] and entry['mtime_ns'] == signature['mtime_ns']
+
+
+def combine_parts(files: List[Path], done: Dict[str, Dict], out_dir: Path) -> int:
+    """Concatenate per-file CSV parts into one CSV, streaming line by line."""
+    rows = 0
+    header_written = False
+    with open(out_dir / COMBINED, 'w', encoding='utf-8-sig', newline='') as combined:
+        for path in files:
+            entry = done.get(str(path))
+            if entry is None:
+                continue
+            with open(entry['part'], encoding='utf-8-sig', newline='') as part:
+                header = part.readline()
+                if not header_written and entry['responses']:
+                    combined.write(header)
+                    header_written = True
+                for line in part:
+                    combined.write(line)
+            rows += entry['responses']
+    return rows
+
+
+def run(inputs: List[str], out_dir: str, workers: int = None, pattern: str = '*.txt',
+        resume: bool = True) -> Dict:
+    out = Path(out_dir)
+    (out / 'summaries').mkdir(parents=True, exist_ok=True)
+    (out / 'parts').mkdir(parents=True, exist_ok=True)
+
+    files = find_exports(inputs, pattern, exclude=out)
+    done = load_manifest(out) if resume else {}
+    todo = [p for p in files if not is_done(p, done)]
+    print(f"{len(files)} dosya bulundu, {len(files) - len(todo)} tanesi daha önce işlenmiş, "
+          f"{len(todo)} işlenecek")
+
+    started = time.perf_counter()
+    messages = 0
+    failed = []
+    with open(out / MANIFEST, 'a' if resume else 'w', encoding='utf-8') as manifest, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        roots = [input_root(item) for item in inputs]
+        futures = {pool.submit(process_file, str(p), str(out), source_label(p, roots)): p for p in todo}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                print(f"❌ {path}: {e}")
+                failed.append(str(path))
+                continue
+            # Her dosya bitince kaydet - kesilirse bu dosya tekrar işlenmez
+            manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            manifest.flush()
+            done[entry['path']] = entry
+            messages += entry['messages']
+            print(f"✅ {path.name}: {entry['messages']} mesaj, {entry['responses']} cevap "
+                  f"({entry['seconds']:.2f} s)")
+
+    elapsed = time.perf_counter() - started
+    processed = len(todo) - len(failed)
+    rows = combine_parts(files, done, out)
+
+    stats = {
+        'files': processed,
+        'failed': failed,
+        'messages': messages,
+        'seconds': elapsed,
+        'files_per_sec': processed / elapsed if elapsed else 0.0,
+        'messages_per_sec': messages / elapsed if elapsed else 0.0,
+        'combined_rows': rows,
+    }
+    print(f"{processed} dosya / {messages} mesaj {elapsed:.2f} s içinde işlendi "
+          f"({stats['files_per_sec']:.1f} dosya/s, {stats['messages_per_sec']:.0f} mesaj/s)")
+    print(f"Birleşik CSV: {out / COMBINED} ({rows} satır)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m batch',
+        description="WhatsApp sohbet dışa aktarımlarını toplu analiz et")
+    parser.add_argument('inputs', nargs='+', help="Klasör veya glob (ör. 'exports/**/*.txt')")
+    parser.add_argument('--out', default='batch_output', help="Çıktı klasörü")
+    parser.add_argument('--workers', type=int, default=None, help="İşlem sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument('--pattern', default='*.txt', help="Klasörlerde aranacak dosya deseni")
+    parser.add_argument('--no-resume', action='store_true', help="Önceki çalışmayı yok say, hepsini yeniden işle")
+    args = parser.parse_args()
+
+    stats = run(args.inputs, args.out, args.workers, args.pattern, resume=not args.no_resume)
+    if stats['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
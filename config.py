@@ -53,6 +53,31 @@ COLORS = {
     "background": "#f8f9fa"
 }
 
+# Groups (Tenancy)
+# Each group gets its own SQLite shard and settings; select it with ?group=<id> in the URL.
+DEFAULT_GROUP = "default"
+SHARD_DIR = "shards"           # Shard files for groups without an explicit db_name
+MAX_OPEN_SHARDS = 32           # Shards kept initialised in memory (LRU)
+
+GROUP_DEFAULTS = {
+    "name": "Futbol Sevenler",
+    "main_capacity": 10,       # Guaranteed to play
+    "total_capacity": 18,      # Max players on the pitch
+    "deadline_weekday": 6,     # 0 = Monday ... 6 = Sunday
+    "deadline_hour": 13,
+    "match_hour": 20,
+}
+
+GROUPS = {
+    "default": {"db_name": "futbol_sevenler.db", "backup_dir": "backups"},
+}
+
+# Roster Storage
+# "table": players table updated in place
+# "events": append-only event log with a materialized snapshot (see event_store.py)
+ROSTER_STORAGE = "table"
+
 # Export Settings
-EXPORT_FORMATS = ["CSV", "Excel", "Text Summary"]
+EXPORT_FORMATS = ["CSV", "Excel", "JSON Lines", "Text Summary"]  # Order shown in the export menu
+EXPORT_CHUNK_SIZE = 1000  # Rows fetched per database round-trip when streaming exports
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
\ No newline at end of file
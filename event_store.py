@@ -0,0 +1,380 @@
+# Event-sourced roster storage for Futbol Sevenler
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from normalization import canonical_key, display_name
+from utils import DatabaseManager
+
+
+class EventSourcedDatabaseManager(DatabaseManager):
+    """Kadro değişikliklerini ekleme-only olay günlüğüne yazan DatabaseManager
+
+    Kayıt, silme ve takım seçimi ``roster_events`` tablosuna birer satır olarak
+    eklenir. Güncel kadro ``roster_snapshot`` tablosunda aynı transaction
+    içinde tek satırla güncellenir. Sıra numarası saklanmaz, kayıt sırasından
+    hesaplanır; bu yüzden silme diğer oyuncuların satırlarına dokunmaz.
+    Bir haftaya ait her ``CHECKPOINT_INTERVAL`` olayda bir, o haftanın
+    kadrosu ``roster_checkpoints`` tablosuna yazılır. Geçmiş bir haftayı
+    yeniden kurmak (rebuild_week) son checkpoint'ten başlar.
+    """
+
+    CHECKPOINT_INTERVAL = 200
+
+    def init_database(self):
+        """Tabloları oluştur; olay günlüğü boşsa mevcut players tablosunu içe al"""
+        super().init_database()
+        try:
+            conn = sqlite3.connect(self.db_name)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS roster_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    year INTEGER NOT NULL,
+                    week INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    name TEXT,
+                    name_key TEXT,
+                    team TEXT,
+                    timestamp TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_roster_events_week ON roster_events (year, week, seq)')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS roster_snapshot (
+                    year INTEGER NOT NULL,
+                    week INTEGER NOT NULL,
+                    name_key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    team TEXT,
+                    timestamp TEXT,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (year, week, name_key)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_roster_snapshot_order ON roster_snapshot (year, week, seq)')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS roster_checkpoints (
+                    year INTEGER NOT NULL,
+                    week INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (year, week, seq)
+                )
+            ''')
+            conn.commit()
+
+            # İlk açılış: tablo modundaki mevcut kadroyu register olayları olarak aktar
+            if cursor.execute('SELECT COUNT(*) FROM roster_events').fetchone()[0] == 0:
+                existing = cursor.execute('''
+                    SELECT name, name_key, team, timestamp, week, year
+                    FROM players ORDER BY year, week, position
+                ''').fetchall()
+                conn.close()
+                if existing:
+                    with self._transaction() as tx:
+                        for name, key, team, timestamp, week, year in existing:
+                            self._record(tx, year, week, 'register', name, key, team, timestamp)
+            else:
+                conn.close()
+        except Exception as e:
+            print(f"Event store init hatası: {e}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Yazma kilidiyle transaction - hata olursa geri alınır"""
+        conn = sqlite3.connect(self.db_name, isolation_level=None)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def _record(self, cursor: sqlite3.Cursor, year: int, week: int, kind: str,
+                name: Optional[str] = None, key: Optional[str] = None,
+                team: Optional[str] = None, timestamp: Optional[str] = None) -> int:
+        """Olayı günlüğe ekle, kadroyu güncelle, gerekirse checkpoint al"""
+        timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        cursor.execute('''
+            INSERT INTO roster_events (year, week, kind, name, name_key, team, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (year, week, kind, name, key, team, timestamp))
+        seq = cursor.lastrowid
+
+        if kind == 'register':
+            cursor.execute('''
+                INSERT INTO roster_snapshot (year, week, name_key, name, team, timestamp, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (year, week, key, name, team or '⚪', timestamp, seq))
+        elif kind == 'remove':
+            cursor.execute('DELETE FROM roster_snapshot WHERE year = ? AND week = ? AND name_key = ?',
+                           (year, week, key))
+        elif kind == 'team':
+            cursor.execute('UPDATE roster_snapshot SET team = ? WHERE year = ? AND week = ? AND name_key = ?',
+                           (team, year, week, key))
+        elif kind == 'archive':
+            cursor.execute('DELETE FROM roster_snapshot WHERE year = ? AND week = ?', (year, week))
+
+        # Sayaç hafta başına: son checkpoint'ten beri bu haftaya kaç olay geldi
+        since_checkpoint = cursor.execute('''
+            SELECT COUNT(*) FROM roster_events
+            WHERE year = ? AND week = ? AND seq > COALESCE(
+                (SELECT MAX(seq) FROM roster_checkpoints WHERE year = ? AND week = ?), 0)
+        ''', (year, week, year, week)).fetchone()[0]
+        if since_checkpoint >= self.CHECKPOINT_INTERVAL:
+            state = cursor.execute('''
+                SELECT name_key, name, team, timestamp, seq FROM roster_snapshot
+                WHERE year = ? AND week = ?
+            ''', (year, week)).fetchall()
+            cursor.execute('INSERT INTO roster_checkpoints (year, week, seq, state) VALUES (?, ?, ?, ?)',
+                           (year, week, seq, json.dumps(state, ensure_ascii=False)))
+        return seq
+
+    @staticmethod
+    def _current_week():
+        now = datetime.now()
+        return now.year, now.isocalendar()[1]
+
+    @staticmethod
+    def _find(cursor: sqlite3.Cursor, year: int, week: int, key: str) -> Optional[tuple]:
+        return cursor.execute('''
+            SELECT name, team FROM roster_snapshot WHERE year = ? AND week = ? AND name_key = ?
+        ''', (year, week, key)).fetchone()
+
+    @staticmethod
+    def _with_positions(rows: List[tuple]) -> List[Dict]:
+        return [
+            {'id': seq, 'name': name, 'position': position, 'timestamp': timestamp, 'team': team}
+            for position, (seq, name, timestamp, team) in enumerate(rows, 1)
+        ]
+
+    def get_all_players(self) -> List[Dict]:
+        """Bu haftanın kadrosu - sıra numarası kayıt sırasından hesaplanır"""
+        try:
+            conn = sqlite3.connect(self.db_name)
+            year, week = self._current_week()
+            rows = conn.execute('''
+                SELECT seq, name, timestamp, team FROM roster_snapshot
+                WHERE year = ? AND week = ?
+                ORDER BY seq
+            ''', (year, week)).fetchall()
+            conn.close()
+            return self._with_positions(rows)
+        except Exception as e:
+            print(f"Get players hatası: {e}")
+            return []
+
+    def add_player(self, name: str, position: int = None, team: str = '⚪') -> bool:
+        """Kayıt olayı ekle (``position`` yok sayılır, sıra hesaplanır)"""
+        try:
+            year, week = self._current_week()
+            key = canonical_key(name)
+            with self._transaction() as cursor:
+                if self._find(cursor, year, week, key):
+                    print(f"{name} zaten var!")
+                    return False
+                self._record(cursor, year, week, 'register', name, key, team)
+            return True
+        except Exception as e:
+            print(f"Add player hatası: {e}")
+            return False
+
+    def remove_player(self, name: str) -> bool:
+        """Silme olayı ekle - diğer oyuncuların satırları değişmez"""
+        try:
+            year, week = self._current_week()
+            key = canonical_key(name)
+            with self._transaction() as cursor:
+                if self._find(cursor, year, week, key):
+                    self._record(cursor, year, week, 'remove', name, key)
+            return True
+        except Exception as e:
+            print(f"Remove player hatası: {e}")
+            return False
+
+    def update_team(self, name: str, team: str) -> bool:
+        """Takım değişikliği olayı ekle"""
+        return self.update_teams({name: team})
+
+    def update_teams(self, assignments: Dict[str, str]) -> bool:
+        """Birden fazla takım değişikliğini tek transaction'da ekle"""
+        try:
+            year, week = self._current_week()
+            with self._transaction() as cursor:
+                for name, team in assignments.items():
+                    key = canonical_key(name)
+                    current = self._find(cursor, year, week, key)
+                    if current and current[1] != team:
+                        self._record(cursor, year, week, 'team', name, key, team)
+            return True
+        except Exception as e:
+            print(f"Update teams hatası: {e}")
+            return False
+
+    def update_positions(self) -> bool:
+        """Sıra numaraları okunurken hesaplandığı için yapılacak bir şey yok"""
+        return True
+
+    def import_players(self, source: Union[pd.DataFrame, List[str]]) -> Dict[str, str]:
+        """Toplu kayıt - her yeni isim için bir register olayı, tek transaction"""
+        candidates = self._import_candidates(source)
+        if not candidates:
+            return {}
+
+        outcomes = {}
+        try:
+            year, week = self._current_week()
+            with self._transaction() as cursor:
+                this_week = {row[0] for row in cursor.execute(
+                    'SELECT name_key FROM roster_snapshot WHERE year = ? AND week = ?', (year, week))}
+                for name, timestamp in candidates:
+                    name = display_name(str(name)) if name is not None else ''
+                    key = canonical_key(name)
+                    if not key:
+                        outcomes[name] = 'invalid'
+                    elif key in this_week:
+                        outcomes.setdefault(name, 'duplicate')
+                    else:
+                        this_week.add(key)
+                        outcomes[name] = 'added'
+                        self._record(cursor, year, week, 'register', name, key, '⚪', timestamp)
+        except Exception as e:
+            print(f"Import players hatası: {e}")
+            return {name: 'error' for name, _ in candidates}
+        return outcomes
+
+    def archive_week(self) -> bool:
+        """Bu haftanın kadrosunu arşive kopyala ve archive olayı ekle (günlük silinmez)"""
+        try:
+            year, week = self._current_week()
+            with self._transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO archive (name, position, timestamp, team, week, year, name_key)
+                    SELECT name, ROW_NUMBER() OVER (ORDER BY seq), timestamp, team, week, year, name_key
+                    FROM roster_snapshot
+                    WHERE year = ? AND week = ?
+                ''', (year, week))
+                self._record(cursor, year, week, 'archive')
+            return True
+        except Exception as e:
+            print(f"Archive hatası: {e}")
+            return False
+
+    def rebuild_week(self, year: int, week: int, upto_seq: Optional[int] = None) -> List[Dict]:
+        """Bir haftanın kadrosunu olay günlüğünden yeniden kur
+
+        ``upto_seq`` verilmezse haftanın arşivlendiği andaki kadro döner
+        (hafta henüz arşivlenmediyse güncel kadro). ``upto_seq`` verilirse
+        o olaydaki hali döner. Kurulum en yakın checkpoint'ten başlar, sadece
+        sonraki olaylar uygulanır.
+        """
+        if upto_seq is None:
+            conn = sqlite3.connect(self.db_name)
+            try:
+                archived_at = conn.execute('''
+                    SELECT MIN(seq) FROM roster_events
+                    WHERE year = ? AND week = ? AND kind = 'archive'
+                ''', (year, week)).fetchone()[0]
+            finally:
+                conn.close()
+            if archived_at is not None:
+                upto_seq = archived_at - 1
+        return self._replay(year, week, upto_seq)
+
+    def _replay(self, year: int, week: int, upto_seq: Optional[int] = None) -> List[Dict]:
+        """Olayları sırayla uygula; archive olayı kadroyu boşaltır (canlı kadro gibi)"""
+        upto_seq = upto_seq if upto_seq is not None else 2 ** 63 - 1
+        conn = sqlite3.connect(self.db_name)
+        try:
+            checkpoint = conn.execute('''
+                SELECT seq, state FROM roster_checkpoints
+                WHERE year = ? AND week = ? AND seq <= ?
+                ORDER BY seq DESC LIMIT 1
+            ''', (year, week, upto_seq)).fetchone()
+
+            state = {}
+            start = 0
+            if checkpoint:
+                start = checkpoint[0]
+                state = {key: [name, team, timestamp, seq]
+                         for key, name, team, timestamp, seq in json.loads(checkpoint[1])}
+
+            events = conn.execute('''
+                SELECT seq, kind, name, name_key, team, timestamp FROM roster_events
+                WHERE year = ? AND week = ? AND seq > ? AND seq <= ?
+                ORDER BY seq
+            ''', (year, week, start, upto_seq))
+            for seq, kind, name, key, team, timestamp in events:
+                if kind == 'register':
+                    state.setdefault(key, [name, team or '⚪', timestamp, seq])
+                elif kind == 'remove':
+                    state.pop(key, None)
+                elif kind == 'team' and key in state:
+                    state[key][1] = team
+                elif kind == 'archive':
+                    state.clear()
+        finally:
+            conn.close()
+
+        rows = sorted(state.values(), key=lambda entry: entry[3])
+        return self._with_positions([(seq, name, timestamp, team) for name, team, timestamp, seq in rows])
+
+    def rebuild_snapshot(self, year: int, week: int) -> bool:
+        """Kadro tablosunu günlükten yeniden yaz (onarım için) - arşivden sonraki hali"""
+        try:
+            players = self._replay(year, week)
+            with self._transaction() as cursor:
+                cursor.execute('DELETE FROM roster_snapshot WHERE year = ? AND week = ?', (year, week))
+                cursor.executemany('''
+                    INSERT INTO roster_snapshot (year, week, name_key, name, team, timestamp, seq)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', [(year, week, canonical_key(p['name']), p['name'], p['team'], p['timestamp'], p['id'])
+                      for p in players])
+            return True
+        except Exception as e:
+            print(f"Rebuild snapshot hatası: {e}")
+            return False
+
+    def get_known_names(self) -> List[str]:
+        """Kadro ve arşivdeki tüm farklı isimler"""
+        try:
+            conn = sqlite3.connect(self.db_name)
+            cursor = conn.execute('''
+                SELECT name, MAX(year * 100 + week) FROM (
+                    SELECT name, name_key, year, week FROM roster_snapshot
+                    UNION ALL
+                    SELECT name, name_key, year, week FROM archive
+                )
+                GROUP BY name_key
+            ''')
+            names = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return names
+        except Exception as e:
+            print(f"Get known names hatası: {e}")
+            return []
+
+    def _export_query(self, table: str) -> str:
+        if table != 'players':
+            return super()._export_query(table)
+        return '''
+            SELECT name, ROW_NUMBER() OVER (PARTITION BY year, week ORDER BY seq) AS position,
+                   timestamp, team, week, year
+            FROM roster_snapshot
+            ORDER BY year, week, position
+        '''
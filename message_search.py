@@ -0,0 +1,154 @@
+# Full-text search over ingested WhatsApp messages (SQLite FTS5)
+
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from message_store import MessageStore
+from normalization import fold_text
+
+
+class MessageSearch:
+    """Sohbet mesajlarını saklayan ve FTS5 ile arayan sınıf
+
+    Mesajlar ``chat_messages`` tablosunda durur; aynı mesaj (zaman, gönderen,
+    metin) tekrar yüklenirse eklenmez. ``chat_messages_fts`` indeksi Türkçe
+    katlanmış metni tutar ("ı"/"İ" dahil), sorgular da aynı şekilde katlanır.
+    Böylece "sık" ile "SIK" aynı sonucu verir. unicode61 tokenizer
+    remove_diacritics 2 ile diğer aksanları da atar.
+    """
+
+    def __init__(self, db_name: str = "futbol_sevenler.db"):
+        self.db_name = db_name
+        self._count: Optional[int] = None  # ingest sıfırlar, count tekrar sayar
+        self.available = self.init_database()
+
+    def init_database(self) -> bool:
+        """Mesaj ve FTS5 tablolarını oluştur - FTS5 yoksa arama kapalı kalır"""
+        try:
+            conn = sqlite3.connect(self.db_name)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sent_at TEXT NOT NULL,
+                    sender TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    source TEXT,
+                    ingested_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_messages_unique
+                ON chat_messages (sent_at, sender, message)
+            ''')
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+                    sender, message,
+                    tokenize = "unicode61 remove_diacritics 2"
+                )
+            ''')
+
+            conn.commit()
+            conn.close()
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"FTS5 kullanılamıyor, mesaj arama kapalı: {e}")
+            return False
+        except Exception as e:
+            print(f"Message search init hatası: {e}")
+            return False
+
+    def ingest(self, store: MessageStore, source: Optional[str] = None) -> int:
+        """Mesajları kaydet ve indeksle - yeni eklenen mesaj sayısını döner"""
+        if not self.available or not len(store):
+            return 0
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_name, isolation_level=None)
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+
+            last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM chat_messages').fetchone()[0]
+            cursor.executemany('''
+                INSERT OR IGNORE INTO chat_messages (sent_at, sender, message, source)
+                VALUES (?, ?, ?, ?)
+            ''', ((store.timestamp(i).strftime('%Y-%m-%d %H:%M:%S'), store.sender(i), store.message(i), source)
+                  for i in range(len(store))))
+
+            # Sadece bu transaction'da eklenen satırları indeksle (tekrarlar atlandı)
+            new_rows = cursor.execute('SELECT id, sender, message FROM chat_messages WHERE id > ?',
+                                      (last_id,)).fetchall()
+            cursor.executemany('INSERT INTO chat_messages_fts (rowid, sender, message) VALUES (?, ?, ?)',
+                               ((row_id, fold_text(sender), fold_text(message))
+                                for row_id, sender, message in new_rows))
+
+            cursor.execute('COMMIT')
+            conn.close()
+            if new_rows:
+                self._count = None
+            return len(new_rows)
+        except Exception as e:
+            print(f"Ingest hatası: {e}")
+            if conn is not None:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                conn.close()
+            return 0
+
+    @staticmethod
+    def build_query(text: str) -> str:
+        """Kullanıcı metnini FTS5 sorgusuna çevir: her kelime ön ek olarak, hepsi AND
+
+        Türkçe ekler için ön ek araması: "top" -> "topu", "topla", "topumu".
+        """
+        return ' '.join(f'"{term}"*' for term in fold_text(text).split())
+
+    def search(self, text: str, sender: Optional[str] = None, days: Optional[int] = None,
+               limit: int = 50) -> List[Dict]:
+        """Mesajlarda ara - en alakalı sonuçlar önce (bm25)"""
+        query = self.build_query(text)
+        if not self.available or not query:
+            return []
+        if sender:
+            query = f'{query} AND sender : ({self.build_query(sender)})'
+
+        conditions = ''
+        params = [query]
+        if days is not None:
+            conditions = 'AND m.sent_at >= ?'
+            params.append((datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S'))
+        params.append(limit)
+
+        try:
+            conn = sqlite3.connect(self.db_name)
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f'''
+                SELECT m.id, m.sent_at, m.sender, m.message, m.source, f.rank AS score
+                FROM chat_messages_fts AS f
+                JOIN chat_messages AS m ON m.id = f.rowid
+                WHERE chat_messages_fts MATCH ? {conditions}
+                ORDER BY f.rank
+                LIMIT ?
+            ''', params).fetchall()
+            conn.close()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"Search hatası: {e}")
+            return []
+
+    def count(self) -> int:
+        """Kayıtlı mesaj sayısı - her çizimde tabloyu taramamak için saklanır"""
+        if not self.available:
+            return 0
+        if self._count is not None:
+            return self._count
+        try:
+            conn = sqlite3.connect(self.db_name)
+            self._count = conn.execute('SELECT COUNT(*) FROM chat_messages').fetchone()[0]
+            conn.close()
+            return self._count
+        except Exception as e:
+            print(f"Count hatası: {e}")
+            return 0
@@ -0,0 +1,134 @@
+# Compact columnar container for parsed WhatsApp messages
+
+import sys
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class MessageStore:
+    """Parsed messages stored column by column instead of one dict per message.
+
+    - sender ids in an ``array('I')`` pointing into an interned name table
+    - timestamps as epoch seconds in an ``array('q')`` (naive local time, as parsed)
+    - all message text in one UTF-8 ``bytearray`` with ``array('Q')`` offsets
+
+    Call ``freeze()`` once the store is built: the text becomes immutable
+    ``bytes`` and ``message_view`` slices stay valid whatever happens next.
+    """
+
+    def __init__(self):
+        self.senders: List[str] = []
+        self._sender_ids: Dict[str, int] = {}
+        self.sender_col = array('I')
+        self.timestamp_col = array('q')
+        self.text = bytearray()
+        self.offsets = array('Q', [0])
+
+    def __len__(self) -> int:
+        return len(self.sender_col)
+
+    def append(self, timestamp: datetime, sender: str, message: str):
+        sender_id = self._sender_ids.get(sender)
+        if sender_id is None:
+            sender_id = len(self.senders)
+            self._sender_ids[sender] = sender_id
+            self.senders.append(sender)
+        self.sender_col.append(sender_id)
+        self.timestamp_col.append((timestamp - _EPOCH) // timedelta(seconds=1))
+        if isinstance(self.text, bytes):
+            # Frozen: copy back into a fresh bytearray; views keep the old bytes alive
+            self.text = bytearray(self.text)
+        self.text += message.encode('utf-8')
+        self.offsets.append(len(self.text))
+
+    def freeze(self) -> 'MessageStore':
+        """Make the text buffer immutable bytes (also drops bytearray over-allocation)."""
+        if not isinstance(self.text, bytes):
+            self.text = bytes(self.text)
+        return self
+
+    def sender(self, i: int) -> str:
+        return self.senders[self.sender_col[i]]
+
+    def timestamp(self, i: int) -> datetime:
+        return _EPOCH + timedelta(seconds=self.timestamp_col[i])
+
+    def message_view(self, i: int) -> memoryview:
+        """UTF-8 bytes of message ``i`` without copying the buffer.
+
+        Only take views from a frozen store. A view into the growing
+        bytearray makes ``append`` raise ``BufferError`` until it is released.
+        """
+        return memoryview(self.text)[self.offsets[i]:self.offsets[i + 1]]
+
+    def message(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __getitem__(self, i: int) -> Dict:
+        """One message in the ``parse_messages`` dict shape (without ``original_line``)."""
+        if i < 0:
+            i += len(self)
+        return {'timestamp': self.timestamp(i), 'sender': self.sender(i), 'message': self.message(i)}
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Columns: timestamp (datetime64), sender (categorical), message (str)."""
+        codes = np.frombuffer(self.sender_col, dtype=np.uint32).astype(np.int32)
+        seconds = np.frombuffer(self.timestamp_col, dtype=np.int64)
+        offsets = self.offsets
+        text = self.text
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(seconds, unit='s'),
+            'sender': pd.Categorical.from_codes(codes, categories=self.senders),
+            'message': [text[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))],
+        })
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the store, including the sender table."""
+        return (sys.getsizeof(self.sender_col) + sys.getsizeof(self.timestamp_col)
+                + sys.getsizeof(self.text) + sys.getsizeof(self.offsets)
+                + sys.getsizeof(self.senders) + sys.getsizeof(self._sender_ids)
+                + sum(sys.getsizeof(s) for s in self.senders))
+
+
+def dict_list_nbytes(messages: List[Dict]) -> int:
+    """Approximate memory of a ``parse_messages`` result (shared objects counted once)."""
+    seen = set()
+    total = sys.getsizeof(messages)
+    for msg in messages:
+        total += sys.getsizeof(msg)
+        for value in msg.values():
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+
+if __name__ == "__main__":
+    # Bytes per message: list of dicts vs MessageStore on a synthetic group chat
+    import random
+    from utils import WhatsAppParser
+
+    random.seed(0)
+    names = [f"Oyuncu {i}" for i in range(60)]
+    replies = ["Geliyorum ⚽", "Maalesef gelemem 😞", "Belki gelirim 🤔", "Ben de varım 👍", "Saat kaçta?"]
+    lines = [f"[10/{i % 28 + 1}/25, {i % 12 + 1}:{i % 60:02d}:{i * 7 % 60:02d} PM] "
+             f"{random.choice(names)}: {random.choice(replies)}" for i in range(50_000)]
+    chat = '\n'.join(lines)
+
+    parser = WhatsAppParser()
+    messages = parser.parse_messages(chat)
+    store = parser.parse_store(chat)
+    as_dicts = dict_list_nbytes(messages) / len(messages)
+    as_columns = store.nbytes() / len(store)
+    print(f"{len(store)} mesaj: list of dicts {as_dicts:.0f} B/mesaj, "
+          f"MessageStore {as_columns:.0f} B/mesaj ({as_dicts / as_columns:.1f}x)")
@@ -0,0 +1,126 @@
+# Turkish-aware name normalization and near-duplicate lookup
+
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# str.lower()/str.upper() use the default Unicode mapping, which gets the
+# Turkish dotted/dotless i wrong ("I".lower() == "i", "İ".lower() == "i̇").
+_TR_LOWER = str.maketrans({'I': 'ı', 'İ': 'i'})
+_TR_UPPER = str.maketrans({'i': 'İ', 'ı': 'I'})
+
+# Letters NFKD does not decompose into base + combining mark
+_FOLD = str.maketrans({'ı': 'i', 'ß': 'ss', 'æ': 'ae', 'ø': 'o', 'đ': 'd', 'ł': 'l'})
+
+
+def turkish_lower(text: str) -> str:
+    """Lowercase with Turkish rules for I/İ."""
+    return text.translate(_TR_LOWER).lower()
+
+
+def turkish_upper(text: str) -> str:
+    """Uppercase with Turkish rules for i/ı."""
+    return text.translate(_TR_UPPER).upper()
+
+
+def display_name(name: str) -> str:
+    """Clean up a typed name for display: "ali  YILMAZ" -> "Ali Yılmaz".
+
+    Unlike str.title() this keeps Turkish letters right and does not
+    capitalise after apostrophes ("Ali'nin" stays as is).
+    """
+    words = []
+    for word in name.split():
+        parts = [turkish_upper(part[:1]) + turkish_lower(part[1:]) for part in word.split('-')]
+        words.append('-'.join(parts))
+    return ' '.join(words)
+
+
+def _fold_chars(text: str) -> Iterator[str]:
+    """Turkish casefold + diacritic fold, one character at a time."""
+    folded = unicodedata.normalize('NFKD', turkish_lower(text).translate(_FOLD))
+    return (ch for ch in folded if not unicodedata.combining(ch))
+
+
+def canonical_key(name: str) -> str:
+    """Matching key: Turkish casefold, diacritics removed, punctuation dropped.
+
+    "Ali Yılmaz", "ALİ YILMAZ" and "ali yilmaz" all map to "ali yilmaz".
+    Stored as ``name_key`` in the database, so its output must not change.
+    """
+    chars = []
+    for ch in _fold_chars(name):
+        if ch.isalnum():
+            chars.append(ch)
+        elif ch.isspace() or ch in "-_.'":
+            chars.append(' ')
+    return ' '.join(''.join(chars).split())
+
+
+def fold_text(text: str) -> str:
+    """Search folding: like canonical_key, but every non-alphanumeric is a word break.
+
+    Message text needs "top/maç" to index as two words; names keep the
+    canonical_key rules.
+    """
+    chars = [ch if ch.isalnum() else ' ' for ch in _fold_chars(text)]
+    return ' '.join(''.join(chars).split())
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a canonical key, padded so short names still match."""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted trigram index over canonical name keys for near-duplicate lookup.
+
+    Lookups only touch names that share at least one trigram with the query,
+    so a few thousand archived names answer well under a millisecond.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._sizes: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}  # key -> first seen display form
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return canonical_key(name) in self._names
+
+    def add(self, name: str):
+        key = canonical_key(name)
+        if not key or key in self._names:
+            return
+        grams = trigrams(key)
+        self._names[key] = name
+        self._sizes[key] = len(grams)
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def similar(self, name: str, threshold: float = 0.7, limit: int = 5) -> List[Tuple[str, float]]:
+        """Known names whose Dice similarity to ``name`` is at least ``threshold``.
+
+        Exact key matches score 1.0. Results are sorted best first.
+        """
+        key = canonical_key(name)
+        if not key:
+            return []
+        grams = trigrams(key)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] += 1
+
+        matches = []
+        for candidate, common in shared.items():
+            score = 2 * common / (len(grams) + self._sizes[candidate])
+            if score >= threshold:
+                matches.append((self._names[candidate], score))
+        matches.sort(key=lambda m: -m[1])
+        return matches[:limit]
@@ -0,0 +1,105 @@
+# Multi-group tenancy: one SQLite shard and one settings block per group
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Type
+
+from analysis_cache import AnalysisCache
+from config import DEFAULT_GROUP, GROUP_DEFAULTS, GROUPS, MAX_OPEN_SHARDS, ROSTER_STORAGE, SHARD_DIR
+from event_store import EventSourcedDatabaseManager
+from message_search import MessageSearch
+from utils import DatabaseManager
+
+_GROUP_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+class GroupShard:
+    """Bir grubun veritabanı, ayarları, analiz önbelleği, mesaj araması ve yedek klasörü"""
+
+    def __init__(self, group_id: str, settings: Dict, db: DatabaseManager, backup_dir: str,
+                 cache: AnalysisCache, search: MessageSearch):
+        self.group_id = group_id
+        self.settings = settings
+        self.db = db
+        self.backup_dir = backup_dir
+        self.cache = cache  # Grubun kendi dosyasında - yüklemeler diğer grupları kilitlemez
+        self.search = search  # Tablolar shard açılırken bir kez kurulur, her çizimde değil
+
+
+class GroupRegistry:
+    """Grup -> shard eşlemesi, en fazla ``max_open`` shard açık tutulur (LRU)
+
+    Her grubun kendi SQLite dosyası olduğu için bir grubun yoğun yazması
+    diğer grupların kilidini etkilemez. Kayıt defterinin kilidi sadece
+    sözlük işlemleri için tutulur; bir shard'ın ilk açılışı (şema kurulumu)
+    sadece o grubun kilidini bekletir.
+    """
+
+    def __init__(self, groups: Dict[str, Dict] = GROUPS, defaults: Dict = GROUP_DEFAULTS,
+                 shard_dir: str = SHARD_DIR, max_open: int = MAX_OPEN_SHARDS,
+                 db_class: Optional[Type[DatabaseManager]] = None):
+        self.groups = groups
+        self.defaults = defaults
+        self.shard_dir = shard_dir
+        self.max_open = max_open
+        if db_class is None:
+            db_class = EventSourcedDatabaseManager if ROSTER_STORAGE == "events" else DatabaseManager
+        self.db_class = db_class
+        self._shards: "OrderedDict[str, GroupShard]" = OrderedDict()
+        self._init_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evicted = 0
+
+    def resolve(self, group_id: Optional[str]) -> str:
+        """URL'den gelen grup kimliğini doğrula - sadece tanımlı gruplar kabul edilir"""
+        group_id = (group_id or DEFAULT_GROUP).strip()
+        if not _GROUP_ID.fullmatch(group_id) or group_id not in self.groups:
+            raise KeyError(group_id)
+        return group_id
+
+    def settings(self, group_id: str) -> Dict:
+        return {**self.defaults, **self.groups[self.resolve(group_id)]}
+
+    def get(self, group_id: Optional[str]) -> GroupShard:
+        """Grubun shard'ını getir, gerekirse aç; en uzun süredir kullanılmayanı kapat"""
+        group_id = self.resolve(group_id)
+        with self._lock:
+            shard = self._shards.get(group_id)
+            if shard is not None:
+                self._shards.move_to_end(group_id)
+                return shard
+            init_lock = self._init_locks.setdefault(group_id, threading.Lock())
+
+        with init_lock:
+            with self._lock:
+                shard = self._shards.get(group_id)
+                if shard is not None:
+                    self._shards.move_to_end(group_id)
+                    return shard
+
+            shard = self._open(group_id)
+
+            with self._lock:
+                self._shards[group_id] = shard
+                self.opened += 1
+                while len(self._shards) > self.max_open:
+                    self._shards.popitem(last=False)
+                    self.evicted += 1
+        return shard
+
+    def _open(self, group_id: str) -> GroupShard:
+        settings = self.settings(group_id)
+        db_name = settings.get('db_name')
+        if not db_name:
+            os.makedirs(self.shard_dir, exist_ok=True)
+            db_name = os.path.join(self.shard_dir, f"{group_id}.db")
+        backup_dir = settings.get('backup_dir') or os.path.join('backups', group_id)
+        return GroupShard(group_id, settings, self.db_class(db_name), backup_dir,
+                          AnalysisCache(db_name), MessageSearch(db_name))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'open': len(self._shards), 'opened': self.opened, 'evicted': self.evicted}
@@ -1,10 +1,20 @@
 import regex as re
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterable, Iterator, BinaryIO, Union, Optional, TYPE_CHECKING
 import streamlit as st
 import sqlite3
+import csv
+import io
+import json
+import hashlib
 from pathlib import Path
+from normalization import canonical_key, display_name
+from message_store import MessageStore
+
+if TYPE_CHECKING:
+    from analysis_cache import AnalysisCache
 
 class DatabaseManager:
     """SQLite Database Manager - Güvenli veri depolama"""
@@ -19,6 +29,9 @@ class DatabaseManager:
             conn = sqlite3.connect(self.db_name)
             cursor = conn.cursor()
             
+            # WAL: okuyanlar (yedekleme dahil) kayıt yazanları bekletmez
+            cursor.execute('PRAGMA journal_mode=WAL')
+            
             # Players tablosu
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS players (
@@ -46,6 +59,17 @@ class DatabaseManager:
                     archived_at TEXT DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+
+            # İsim anahtarı (Türkçe harf duyarlı eşleştirme) - eski veritabanlarına sütun ekle
+            conn.create_function('name_key', 1, canonical_key, deterministic=True)
+            for table in ('players', 'archive'):
+                columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+                if 'name_key' not in columns:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN name_key TEXT')
+                cursor.execute(f'UPDATE {table} SET name_key = name_key(name) WHERE name_key IS NULL')
+
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_players_name_key ON players (name_key, year, week)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_archive_name_key ON archive (name_key)')
             
             conn.commit()
             conn.close()
@@ -78,7 +102,7 @@ class DatabaseManager:
             return []
     
     def add_player(self, name: str, position: int, team: str = '⚪') -> bool:
-        """Yeni oyuncu ekle"""
+        """Yeni oyuncu ekle - aynı isim anahtarı bu hafta varsa eklemez"""
         try:
             conn = sqlite3.connect(self.db_name)
             cursor = conn.cursor()
@@ -86,11 +110,21 @@ class DatabaseManager:
             week = datetime.now().isocalendar()[1]
             year = datetime.now().year
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            key = canonical_key(name)
             
+            # "Ali Yılmaz" ve "ali yilmaz" aynı kişi
             cursor.execute('''
-                INSERT INTO players (name, position, timestamp, team, week, year)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (name, position, timestamp, team, week, year))
+                INSERT INTO players (name, position, timestamp, team, week, year, name_key)
+                SELECT ?, ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM players WHERE name_key = ? AND year = ? AND week = ?
+                )
+            ''', (name, position, timestamp, team, week, year, key, key, year, week))
+            
+            if cursor.rowcount == 0:
+                conn.close()
+                print(f"{name} zaten var!")
+                return False
             
             conn.commit()
             conn.close()
@@ -156,8 +190,8 @@ class DatabaseManager:
             
             # Oyuncuları arşive kopyala
             cursor.execute('''
-                INSERT INTO archive (name, position, timestamp, team, week, year)
-                SELECT name, position, timestamp, team, week, year 
+                INSERT INTO archive (name, position, timestamp, team, week, year, name_key)
+                SELECT name, position, timestamp, team, week, year, name_key
                 FROM players 
                 WHERE week = ? AND year = ?
             ''', (week, year))
@@ -184,11 +218,12 @@ class DatabaseManager:
             week = datetime.now().isocalendar()[1]
             year = datetime.now().year
             
-            # Oyuncuları timestamp'e göre sırala ve yeni pozisyon ver
+            # Mevcut sırayı koru, boşlukları kapat. timestamp'e göre sıralanmaz:
+            # içe aktarılan oyuncuların timestamp'i mesaj zamanıdır, kayıt sırası değil
             cursor.execute('''
                 SELECT id FROM players 
                 WHERE week = ? AND year = ?
-                ORDER BY timestamp ASC
+                ORDER BY position ASC, id ASC
             ''', (week, year))
             
             rows = cursor.fetchall()
@@ -205,9 +240,194 @@ class DatabaseManager:
             print(f"Update positions hatası: {e}")
             return False
 
+    def get_player_ratings(self, names: List[str], total_capacity: int = 18) -> Dict[str, float]:
+        """Arşiv geçmişinden oyuncu puanlarını hesapla (oynanan hafta sayısı)"""
+        ratings = {name: 1.0 for name in names}
+        if not names:
+            return ratings
+        try:
+            conn = sqlite3.connect(self.db_name)
+            cursor = conn.cursor()
+
+            # Sahaya çıkan (ilk total_capacity) haftaları say - yeni gelenler taban puanla başlar
+            keys = {canonical_key(name): name for name in names}
+            placeholders = ','.join('?' * len(keys))
+            cursor.execute(f'''
+                SELECT name_key, COUNT(DISTINCT year * 100 + week)
+                FROM archive
+                WHERE name_key IN ({placeholders}) AND position <= ?
+                GROUP BY name_key
+            ''', list(keys) + [total_capacity])
+
+            for key, weeks_played in cursor.fetchall():
+                ratings[keys[key]] = 1.0 + weeks_played
+
+            conn.close()
+        except Exception as e:
+            print(f"Get ratings hatası: {e}")
+        return ratings
+
+    def update_teams(self, assignments: Dict[str, str]) -> bool:
+        """Birden fazla oyuncunun takımını tek transaction'da güncelle"""
+        try:
+            conn = sqlite3.connect(self.db_name)
+            cursor = conn.cursor()
+
+            week = datetime.now().isocalendar()[1]
+            year = datetime.now().year
+
+            cursor.executemany('''
+                UPDATE players
+                SET team = ?
+                WHERE name = ? AND week = ? AND year = ?
+            ''', [(team, name, week, year) for name, team in assignments.items()])
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Update teams hatası: {e}")
+            return False
+
+    def import_players(self, source: Union[pd.DataFrame, List[str]]) -> Dict[str, str]:
+        """Toplu oyuncu ekle - tek transaction ve executemany ile
+
+        ``source`` ya AttendanceTracker.extract_attendance çıktısı (sadece 'Yes'
+        cevapları alınır, mesaj zamanına göre sıralanır) ya da isim listesidir.
+        Her isim için sonuç döner: 'added', 'duplicate', 'conflict' veya 'invalid'
+        (hata olursa hiçbiri eklenmez ve hepsi 'error' olur).
+        """
+        candidates = self._import_candidates(source)
+        if not candidates:
+            return {}
+
+        outcomes = {}
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_name, isolation_level=None)
+            cursor = conn.cursor()
+
+            week = datetime.now().isocalendar()[1]
+            year = datetime.now().year
+
+            # Yazma kilidini baştan al - sıra numaraları eşzamanlı kayıtlarla çakışmasın
+            cursor.execute('BEGIN IMMEDIATE')
+
+            this_week = set()
+            other_weeks = set()
+            for name, key, current in cursor.execute(
+                    'SELECT name, name_key, week = ? AND year = ? FROM players', (week, year)):
+                if current:
+                    this_week.add(key)
+                else:
+                    other_weeks.add(name)
+
+            cursor.execute('SELECT COALESCE(MAX(position), 0) FROM players WHERE week = ? AND year = ?',
+                           (week, year))
+            position = cursor.fetchone()[0]
+
+            rows = []
+            for name, timestamp in candidates:
+                name = display_name(str(name)) if name is not None else ''
+                key = canonical_key(name)
+                if not key:
+                    outcomes[name] = 'invalid'
+                elif key in this_week:
+                    outcomes.setdefault(name, 'duplicate')
+                elif name in other_weeks:
+                    # name sütunu UNIQUE; arşivlenmemiş eski hafta kaydı var
+                    outcomes[name] = 'conflict'
+                else:
+                    position += 1
+                    this_week.add(key)
+                    outcomes[name] = 'added'
+                    rows.append((name, position, timestamp, '⚪', week, year, key))
+
+            cursor.executemany('''
+                INSERT INTO players (name, position, timestamp, team, week, year, name_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+            cursor.execute('COMMIT')
+            conn.close()
+        except Exception as e:
+            print(f"Import players hatası: {e}")
+            if conn is not None:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                conn.close()
+            return {name: 'error' for name, _ in candidates}
+        return outcomes
+
+    @staticmethod
+    def _import_candidates(source: Union[pd.DataFrame, List[str]]) -> List[Tuple[str, str]]:
+        """Toplu ekleme için (isim, zaman) listesi - DataFrame ise 'Yes' cevapları, zamana göre"""
+        if isinstance(source, pd.DataFrame):
+            if source.empty:
+                return []
+            yes = source[source['response'] == 'Yes'].sort_values('timestamp', kind='stable')
+            return list(zip(yes['name'], yes['timestamp']))
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return [(name, now) for name in source]
+
+    def get_known_names(self) -> List[str]:
+        """Bu hafta ve arşivdeki tüm farklı isimleri getir (benzer isim indeksi için)"""
+        try:
+            conn = sqlite3.connect(self.db_name)
+            cursor = conn.cursor()
+
+            # Her isim anahtarı için en son kullanılan yazım
+            cursor.execute('''
+                SELECT name, MAX(year * 100 + week) FROM (
+                    SELECT name, name_key, year, week FROM players
+                    UNION ALL
+                    SELECT name, name_key, year, week FROM archive
+                )
+                GROUP BY name_key
+            ''')
+            names = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return names
+        except Exception as e:
+            print(f"Get known names hatası: {e}")
+            return []
+
+    # Dışa aktarılabilen tablolar ve sütunları
+    EXPORT_COLUMNS = {
+        'players': ['name', 'position', 'timestamp', 'team', 'week', 'year'],
+        'archive': ['name', 'position', 'timestamp', 'team', 'week', 'year', 'archived_at'],
+    }
+
+    def iter_rows(self, table: str, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+        """Tablo satırlarını parça parça getir - tüm tabloyu belleğe almadan"""
+        if table not in self.EXPORT_COLUMNS:
+            raise ValueError(f"Bilinmeyen tablo: {table}")
+
+        conn = sqlite3.connect(self.db_name)
+        try:
+            cursor = conn.execute(self._export_query(table))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def _export_query(self, table: str) -> str:
+        """iter_rows için SELECT sorgusu"""
+        columns = ', '.join(self.EXPORT_COLUMNS[table])
+        return f'''
+            SELECT {columns} FROM {table}
+            ORDER BY year, week, position
+        '''
+
 class WhatsAppParser:
     """Parser for WhatsApp chat messages to extract user information and responses."""
     
+    # Bump when classification logic outside the pattern lists changes
+    CLASSIFIER_REVISION = 1
+    
     def __init__(self):
         # Turkish positive responses
         self.positive_patterns = [
@@ -235,10 +455,29 @@ class WhatsAppParser:
         # WhatsApp message pattern
         self.message_pattern = r'\[(\d{1,2}\/\d{1,2}\/\d{2,4},\s+\d{1,2}:\d{2}:\d{2}\s+(?:AM|PM))\]\s+([^:]+):\s+(.*)'
     
+    @property
+    def pattern_version(self) -> str:
+        """Short hash of the classifier patterns; changes whenever they are edited."""
+        patterns = json.dumps([self.CLASSIFIER_REVISION, self.message_pattern, self.positive_patterns,
+                               self.negative_patterns, self.maybe_patterns])
+        return hashlib.blake2b(patterns.encode('utf-8'), digest_size=8).hexdigest()
+    
     def parse_messages(self, text: str) -> List[Dict]:
         """Parse WhatsApp messages and extract structured data."""
-        messages = []
-        
+        return [
+            {'timestamp': timestamp, 'sender': sender, 'message': message, 'original_line': line}
+            for timestamp, sender, message, line in self._iter_messages(text)
+        ]
+    
+    def parse_store(self, text: str) -> MessageStore:
+        """Parse WhatsApp messages into a compact columnar MessageStore."""
+        store = MessageStore()
+        for timestamp, sender, message, _ in self._iter_messages(text):
+            store.append(timestamp, sender, message)
+        return store.freeze()
+    
+    def _iter_messages(self, text: str) -> Iterator[Tuple[datetime, str, str, str]]:
+        """Yield (timestamp, sender, message, line) for each WhatsApp message line."""
         # Split text into lines and process each line
         lines = text.strip().split('\n')
         
@@ -262,14 +501,7 @@ class WhatsAppParser:
                 except:
                     timestamp = datetime.now()
                 
-                messages.append({
-                    'timestamp': timestamp,
-                    'sender': sender,
-                    'message': message.strip(),
-                    'original_line': line
-                })
-        
-        return messages
+                yield timestamp, sender, message.strip(), line
     
     def _clean_name(self, name: str) -> str:
         """Clean and normalize sender names."""
@@ -282,7 +514,7 @@ class WhatsAppParser:
         if name.startswith('~'):
             name = name[1:]
         
-        return name.title()  # Capitalize properly
+        return display_name(name)  # Capitalize properly (Turkish-aware)
     
     def _parse_timestamp(self, timestamp_str: str) -> datetime:
         """Parse WhatsApp timestamp string."""
@@ -309,8 +541,11 @@ class AttendanceTracker:
     def __init__(self):
         self.parser = WhatsAppParser()
     
-    def extract_attendance(self, messages: List[Dict]) -> pd.DataFrame:
+    def extract_attendance(self, messages: Union[List[Dict], MessageStore]) -> pd.DataFrame:
         """Extract attendance information from parsed messages."""
+        if isinstance(messages, MessageStore):
+            return self._extract_from_store(messages)
+        
         attendance_data = []
         
         # Group messages by sender to get latest response
@@ -344,11 +579,44 @@ class AttendanceTracker:
         
         return pd.DataFrame(attendance_data)
     
+    def analyze_upload(self, data: bytes, cache: Optional['AnalysisCache'] = None) -> pd.DataFrame:
+        """Parse and classify an uploaded chat export, reusing cached results when possible."""
+        def compute() -> pd.DataFrame:
+            text = data.decode('utf-8', errors='replace')
+            return self.extract_attendance(self.parser.parse_store(text))
+        
+        if cache is None:
+            return compute()
+        return cache.get_or_compute(data, self.parser.pattern_version, compute)
+    
+    def _extract_from_store(self, store: MessageStore) -> pd.DataFrame:
+        """Same as extract_attendance, grouping the store's DataFrame by sender."""
+        attendance_data = []
+        df = store.to_dataframe()
+        
+        # sort=False keeps senders in first-seen order, like the dict-based path
+        for sender, group in df.groupby('sender', observed=True, sort=False):
+            group = group.sort_values('timestamp', kind='stable')
+            response = self._analyze_text(' '.join(group['message']).lower())
+            
+            if response:
+                attendance_data.append({
+                    'name': sender,
+                    'response': response,
+                    'message': group['message'].iloc[-1],
+                    'timestamp': group['timestamp'].iloc[-1].strftime('%Y-%m-%d %H:%M:%S'),
+                    'message_count': len(group)
+                })
+        
+        return pd.DataFrame(attendance_data)
+    
     def _analyze_responses(self, messages: List[Dict]) -> str:
         """Analyze messages to determine attendance response."""
         # Combine all messages from this sender
-        combined_text = ' '.join([msg['message'].lower() for msg in messages])
-        
+        return self._analyze_text(' '.join([msg['message'].lower() for msg in messages]))
+    
+    def _analyze_text(self, combined_text: str) -> str:
+        """Score a sender's combined, lowercased messages against the response patterns."""
         # Count pattern matches
         positive_score = sum(len(re.findall(pattern, combined_text, re.IGNORECASE)) 
                             for pattern in self.parser.positive_patterns)
@@ -386,17 +654,18 @@ class AttendanceTracker:
 class RegistrationManager:
     """Manage player registration system with capacity limits."""
     
-    def __init__(self):
-        self.main_list_capacity = 10  # First 10 players - guaranteed to play
-        self.total_capacity = 18      # Total players that can play
+    def __init__(self, main_list_capacity: int = 10, total_capacity: int = 18):
+        self.main_list_capacity = main_list_capacity  # First players - guaranteed to play
+        self.total_capacity = total_capacity          # Total players that can play
         
     def register_player(self, name: str, current_players: List[Dict]) -> Dict:
         """Register a new player with automatic list assignment."""
         from datetime import datetime
         
-        # Check if player already registered
+        # Check if player already registered (Turkish-aware, ignores diacritics)
+        key = canonical_key(name)
         for player in current_players:
-            if player['name'].lower() == name.lower():
+            if canonical_key(player['name']) == key:
                 return {
                     'success': False,
                     'message': f'{name} zaten kayıtlı!',
@@ -419,12 +688,14 @@ class RegistrationManager:
         updated_list = current_players + [new_player]
         
         # Determine message based on position
-        if position <= 10:
-            message = f'{name} ana listeye eklendi! (Sıra: {position}/10) - Kesin oynayacaksınız! 🎯'
-        elif position <= 18:
-            message = f'{name} bekleme listesine eklendi! (Sıra: {position}/18) - Ana listeden biri gelmezse oynayacaksınız! ⏳'
+        main_cap = self.main_list_capacity
+        total_cap = self.total_capacity
+        if position <= main_cap:
+            message = f'{name} ana listeye eklendi! (Sıra: {position}/{main_cap}) - Kesin oynayacaksınız! 🎯'
+        elif position <= total_cap:
+            message = f'{name} bekleme listesine eklendi! (Sıra: {position}/{total_cap}) - Ana listeden biri gelmezse oynayacaksınız! ⏳'
         else:
-            message = f'{name} yedek listesine eklendi! (Sıra: {position}) - 18 kişiden biri gelmezse sahaya alınacaksınız! 📝'
+            message = f'{name} yedek listesine eklendi! (Sıra: {position}) - {total_cap} kişiden biri gelmezse sahaya alınacaksınız! 📝'
         
         return {
             'success': True,
@@ -453,27 +724,269 @@ class RegistrationManager:
     
     def get_list_status(self, current_players: List[Dict]) -> Dict:
         """Get current status of all lists."""
-        main_list = [p for p in current_players if p['position'] <= 10]
-        waiting_list = [p for p in current_players if 10 < p['position'] <= 18]
-        reserve_list = [p for p in current_players if p['position'] > 18]
+        main_cap = self.main_list_capacity
+        total_cap = self.total_capacity
+        main_list = [p for p in current_players if p['position'] <= main_cap]
+        waiting_list = [p for p in current_players if main_cap < p['position'] <= total_cap]
+        reserve_list = [p for p in current_players if p['position'] > total_cap]
         
         return {
             'main_list': main_list,
             'waiting_list': waiting_list,
             'reserve_list': reserve_list,
             'total_registered': len(current_players),
-            'main_available': max(0, 10 - len(main_list)),
-            'waiting_available': max(0, 18 - len(main_list) - len(waiting_list))
+            'main_available': max(0, main_cap - len(main_list)),
+            'waiting_available': max(0, total_cap - len(main_list) - len(waiting_list))
         }
 
+class TeamBalancer:
+    """Split playing players into two rating-balanced teams."""
+
+    BLUE = '🟦'
+    YELLOW = '🟨'
+    NO_TEAM = '⚪'
+
+    # 2^(n-1) splits are scored at once; 20 players is ~500k splits
+    EXHAUSTIVE_LIMIT = 20
+
+    def balance(self, players: List[Dict], ratings: Dict[str, float]) -> Dict[str, str]:
+        """Assign every player to 🟦 or 🟨, honouring picked teams where possible.
+
+        Players that already chose 🟦/🟨 keep their side unless that makes the
+        teams uneven in size; among those splits the rating gap is minimised.
+        """
+        if not players:
+            return {}
+
+        names = [p['name'] for p in players]
+        weights = np.array([float(ratings.get(name, 1.0)) for name in names])
+        prefs = np.array([p.get('team') or self.NO_TEAM for p in players])
+        wants_blue = (prefs == self.BLUE).astype(np.float64)
+        wants_yellow = (prefs == self.YELLOW).astype(np.float64)
+
+        if len(players) <= self.EXHAUSTIVE_LIMIT:
+            in_blue = self._solve_exhaustive(weights, wants_blue, wants_yellow)
+        else:
+            in_blue = self._solve_heuristic(weights, wants_blue, wants_yellow)
+
+        return {name: self.BLUE if blue else self.YELLOW
+                for name, blue in zip(names, in_blue)}
+
+    def _solve_exhaustive(self, weights: np.ndarray, wants_blue: np.ndarray,
+                          wants_yellow: np.ndarray) -> np.ndarray:
+        """Score every split at once with NumPy and pick the best one."""
+        n = len(weights)
+
+        # The last player is always on side B, so each split appears once;
+        # both colourings of side A are scored below. Per-mask sums are built
+        # by doubling (2^k new entries per player) instead of a mask x bit matrix.
+        sums = np.zeros(1)
+        sizes = np.zeros(1, dtype=np.int64)
+        blue_in_a = np.zeros(1)
+        yellow_in_a = np.zeros(1)
+        for i in range(n - 1):
+            sums = np.concatenate((sums, sums + weights[i]))
+            sizes = np.concatenate((sizes, sizes + 1))
+            blue_in_a = np.concatenate((blue_in_a, blue_in_a + wants_blue[i]))
+            yellow_in_a = np.concatenate((yellow_in_a, yellow_in_a + wants_yellow[i]))
+
+        valid = np.flatnonzero((sizes == n // 2) | (sizes == n - n // 2))
+        sums = sums[valid]
+        blue_in_a = blue_in_a[valid]
+        yellow_in_a = yellow_in_a[valid]
+
+        total = weights.sum()
+        gap = np.abs(2 * sums - total)
+
+        # A=blue breaks blue prefs outside A and yellow prefs inside A
+        broken_a_blue = (wants_blue.sum() - blue_in_a) + yellow_in_a
+        broken_a_yellow = blue_in_a + (wants_yellow.sum() - yellow_in_a)
+
+        # A broken preference always costs more than any rating gap
+        penalty = total + 1.0
+        cost_a_blue = gap + penalty * broken_a_blue
+        cost_a_yellow = gap + penalty * broken_a_yellow
+
+        best_blue = int(np.argmin(cost_a_blue))
+        best_yellow = int(np.argmin(cost_a_yellow))
+        if cost_a_blue[best_blue] <= cost_a_yellow[best_yellow]:
+            return self._mask_to_bits(valid[best_blue], n)
+        return ~self._mask_to_bits(valid[best_yellow], n)
+
+    @staticmethod
+    def _mask_to_bits(mask: int, n: int) -> np.ndarray:
+        """Turn a split index back into a per-player side-A flag array."""
+        return ((int(mask) >> np.arange(n)) & 1).astype(bool)
+
+    def _solve_heuristic(self, weights: np.ndarray, wants_blue: np.ndarray,
+                         wants_yellow: np.ndarray) -> np.ndarray:
+        """Greedy split followed by best-swap improvement for large rosters."""
+        n = len(weights)
+        blue_cap = n - n // 2
+        yellow_cap = n // 2
+        in_blue = np.zeros(n, dtype=bool)
+        blue_sum = yellow_sum = 0.0
+        blue_size = yellow_size = 0
+
+        # Preferences first, strongest players first, so they get their side
+        order = sorted(range(n), key=lambda i: (-(wants_blue[i] + wants_yellow[i]), -weights[i]))
+        for i in order:
+            if wants_blue[i] and blue_size < blue_cap:
+                to_blue = True
+            elif wants_yellow[i] and yellow_size < yellow_cap:
+                to_blue = False
+            elif blue_size >= blue_cap:
+                to_blue = False
+            elif yellow_size >= yellow_cap:
+                to_blue = True
+            else:
+                to_blue = blue_sum <= yellow_sum
+
+            in_blue[i] = to_blue
+            if to_blue:
+                blue_sum += weights[i]
+                blue_size += 1
+            else:
+                yellow_sum += weights[i]
+                yellow_size += 1
+
+        # Only swap players without a preference so picked teams stay intact
+        free = (wants_blue == 0) & (wants_yellow == 0)
+        for _ in range(n):
+            diff = weights[in_blue].sum() - weights[~in_blue].sum()
+            blue_idx = np.flatnonzero(in_blue & free)
+            yellow_idx = np.flatnonzero(~in_blue & free)
+            if not len(blue_idx) or not len(yellow_idx):
+                break
+
+            # Moving b to yellow and y to blue changes diff by -2(w_b - w_y)
+            delta = weights[blue_idx][:, None] - weights[yellow_idx][None, :]
+            new_gap = np.abs(diff - 2 * delta)
+            b, y = np.unravel_index(np.argmin(new_gap), new_gap.shape)
+            if new_gap[b, y] >= abs(diff) - 1e-9:
+                break
+            in_blue[blue_idx[b]] = False
+            in_blue[yellow_idx[y]] = True
+
+        return in_blue
+
 class DataExporter:
     """Handle data export functionality."""
     
+    # Excel sheets stop at 1,048,576 rows (header included)
+    XLSX_MAX_ROWS = 1048575
+
     @staticmethod
     def to_csv(df: pd.DataFrame) -> str:
         """Export DataFrame to CSV string."""
         return df.to_csv(index=False)
-    
+
+    @staticmethod
+    def export_table(db: 'DatabaseManager', table: str, fmt: str,
+                     target: Union[str, Path, BinaryIO], chunk_size: int = 1000) -> int:
+        """Stream a database table to a file or buffer without building a DataFrame."""
+        return DataExporter.export_rows(db.iter_rows(table, chunk_size),
+                                        db.EXPORT_COLUMNS[table], fmt, target)
+
+    @staticmethod
+    def export_rows(chunks: Iterable[List[tuple]], columns: List[str], fmt: str,
+                    target: Union[str, Path, BinaryIO]) -> int:
+        """Write row chunks as csv, xlsx, jsonl or txt and return the row count.
+
+        Only one chunk is held in memory at a time. ``target`` is a file path
+        or a binary file object such as ``io.BytesIO`` for download buttons.
+        """
+        writers = {
+            'csv': DataExporter._write_csv,
+            'xlsx': DataExporter._write_xlsx,
+            'jsonl': DataExporter._write_jsonl,
+            'txt': DataExporter._write_txt,
+        }
+        writer = writers.get(fmt.lower())
+        if writer is None:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        if isinstance(target, (str, Path)):
+            with open(target, 'wb') as fh:
+                return writer(chunks, columns, fh)
+        return writer(chunks, columns, target)
+
+    @staticmethod
+    def _write_csv(chunks: Iterable[List[tuple]], columns: List[str], fh: BinaryIO) -> int:
+        # utf-8-sig so Excel shows Turkish characters correctly
+        text = io.TextIOWrapper(fh, encoding='utf-8-sig', newline='')
+        writer = csv.writer(text)
+        writer.writerow(columns)
+        count = 0
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+        text.flush()
+        text.detach()  # leave the caller's buffer open
+        return count
+
+    @staticmethod
+    def _write_jsonl(chunks: Iterable[List[tuple]], columns: List[str], fh: BinaryIO) -> int:
+        text = io.TextIOWrapper(fh, encoding='utf-8', newline='\n')
+        count = 0
+        for chunk in chunks:
+            text.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                            for row in chunk)
+            count += len(chunk)
+        text.flush()
+        text.detach()
+        return count
+
+    @staticmethod
+    def _write_txt(chunks: Iterable[List[tuple]], columns: List[str], fh: BinaryIO) -> int:
+        # Readable list for sharing; roster tables get one heading per week
+        text = io.TextIOWrapper(fh, encoding='utf-8', newline='\n')
+        idx = {column: i for i, column in enumerate(columns)}
+        roster = {'name', 'position', 'week', 'year'} <= idx.keys()
+        if not roster:
+            text.write(' | '.join(columns) + '\n')
+        current_week = None
+        count = 0
+        for chunk in chunks:
+            for row in chunk:
+                if not roster:
+                    text.write(' | '.join('' if v is None else str(v) for v in row) + '\n')
+                    continue
+                week = (row[idx['year']], row[idx['week']])
+                if week != current_week:
+                    if current_week is not None:
+                        text.write('\n')
+                    text.write(f"📅 {week[0]} - Hafta {week[1]}\n")
+                    current_week = week
+                team = f" {row[idx['team']]}" if 'team' in idx and row[idx['team']] else ''
+                text.write(f"{row[idx['position']]}. {row[idx['name']]}{team}\n")
+            count += len(chunk)
+        text.flush()
+        text.detach()
+        return count
+
+    @staticmethod
+    def _write_xlsx(chunks: Iterable[List[tuple]], columns: List[str], fh: BinaryIO) -> int:
+        from openpyxl import Workbook
+
+        # write_only keeps memory constant; rows are flushed as they are appended
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Data')
+        sheet.append(columns)
+        sheet_rows = 0
+        count = 0
+        for chunk in chunks:
+            for row in chunk:
+                if sheet_rows == DataExporter.XLSX_MAX_ROWS:
+                    sheet = workbook.create_sheet(f'Data {len(workbook.worksheets) + 1}')
+                    sheet.append(columns)
+                    sheet_rows = 0
+                sheet.append(row)
+                sheet_rows += 1
+            count += len(chunk)
+        workbook.save(fh)
+        return count
+
     @staticmethod
     def to_summary_text(df: pd.DataFrame) -> str:
         """Generate a summary text report."""
@@ -492,19 +1005,19 @@ Maybe: {maybe_count} ({maybe_count/total*100:.1f}%)
 Not Coming (No): {no_count} ({no_count/total*100:.1f}%)
 
 ✅ COMING ({yes_count} people):
-{chr(10).join([f"- {row['name']}" for _, row in df[df['response'] == 'Yes'].iterrows()])}
+{chr(10).join(f"- {name}" for name in df.loc[df['response'] == 'Yes', 'name'])}
 
 🤔 MAYBE ({maybe_count} people):
-{chr(10).join([f"- {row['name']}" for _, row in df[df['response'] == 'Maybe'].iterrows()])}
+{chr(10).join(f"- {name}" for name in df.loc[df['response'] == 'Maybe', 'name'])}
 
 ❌ NOT COMING ({no_count} people):
-{chr(10).join([f"- {row['name']}" for _, row in df[df['response'] == 'No'].iterrows()])}
+{chr(10).join(f"- {name}" for name in df.loc[df['response'] == 'No', 'name'])}
 
 📝 DETAILED RESPONSES:
 """
         
-        for _, row in df.iterrows():
-            summary += f"\n{row['name']} ({row['response']}): {row['message'][:50]}..."
+        summary += ''.join(f"\n{name} ({response}): {message[:50]}..."
+                           for name, response, message in zip(df['name'], df['response'], df['message']))
         
         return summary
 